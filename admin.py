@@ -16,4 +16,4 @@ class CustomUserAdmin(UserAdmin):
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
-    list_display = ['user', 'profession', 'whatsapp_number', 'whatsapp_verified']
\ No newline at end of file
+    list_display = ['user', 'profession', 'whatsapp_number', 'whatsapp_verified']
@@ -0,0 +1,152 @@
+import base64
+from datetime import datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.generics import ListAPIView
+from rest_framework.pagination import BasePagination
+from rest_framework.permissions import BasePermission, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from apps.core.routers import use_replica
+from apps.messaging.membership import is_room_member
+from apps.messaging.models import Message
+from apps.messaging.partitions import month_range, room_messages_page
+from apps.messaging.readstate import unread_counts
+from apps.messaging.serializers import MessageSerializer
+
+
+class IsRoomMember(BasePermission):
+    """
+    Only members of the room in the URL may read its messages
+    """
+    message = 'You are not a member of this room.'
+    
+    def has_permission(self, request, view):
+        return is_room_member(view.kwargs['room_id'], request.user.id)
+
+
+class MessageHistoryPagination(BasePagination):
+    """
+    Keyset pagination on (created_at, id), newest first.
+    
+    The cursor holds the (created_at, id) of the last row served, and the
+    next page is the rows strictly before it. That is an index range scan on
+    created_at from the cursor, with no OFFSET, and rows sharing a timestamp
+    are neither skipped nor repeated.
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by('-created_at', '-id')
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            created_at, pk = cursor
+            # (created_at, id) < cursor, written so created_at stays a range condition
+            queryset = queryset.filter(created_at__lte=created_at).exclude(
+                created_at=created_at, id__gte=pk
+            )
+        
+        page = list(queryset[:page_size + 1])
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.last = (page[-1].created_at, page[-1].pk) if page else None
+        return page
+    
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+    
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().rsplit('|', 1)
+            return datetime.fromisoformat(created_at), int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise NotFound('Invalid cursor')
+    
+    def encode_cursor(self, position):
+        created_at, pk = position
+        raw = f'{created_at.isoformat()}|{pk}'
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+    
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        params = self.request.query_params.copy()
+        params[self.cursor_query_param] = self.encode_cursor(self.last)
+        return self.request.build_absolute_uri(f'{self.request.path}?{params.urlencode()}')
+    
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+class MonthMessagePagination(MessageHistoryPagination):
+    """
+    The same (created_at, id) keyset, oldest first, over one month of a room
+    including its archived months. Pages are lists of row dicts.
+    """
+    
+    def paginate_month(self, request, room_id, start, end):
+        self.request = request
+        page_size = self.get_page_size(request)
+        page = room_messages_page(room_id, start, end, page_size + 1, after=self.decode_cursor(request))
+        self.has_next = len(page) > page_size
+        page = page[:page_size]
+        self.last = (datetime.fromisoformat(page[-1]['created_at']), page[-1]['id']) if page else None
+        return page
+
+
+class RoomMessageHistoryView(ListAPIView):
+    """
+    Older messages of a room, newest first; follow `next` for earlier pages.
+    """
+    serializer_class = MessageSerializer
+    pagination_class = MessageHistoryPagination
+    permission_classes = [IsAuthenticated, IsRoomMember]
+    
+    def get_queryset(self):
+        return Message.objects.filter(group_id=self.kwargs['room_id']).select_related('sender')
+    
+    def list(self, request, *args, **kwargs):
+        # The membership check (initial()) has already run on the primary
+        with use_replica():
+            return super().list(request, *args, **kwargs)
+
+
+class RoomMessageMonthView(APIView):
+    """
+    Messages of a room in one month (?month=YYYY-MM), oldest first, including
+    months that have been moved to the cold archive; follow `next` for later
+    pages.
+    """
+    permission_classes = [IsAuthenticated, IsRoomMember]
+    
+    def get(self, request, room_id):
+        try:
+            month = datetime.strptime(request.query_params.get('month', ''), '%Y-%m').date()
+        except ValueError:
+            return Response({'error': 'month must be YYYY-MM'}, status=400)
+        start, end = month_range(month)
+        paginator = MonthMessagePagination()
+        page = paginator.paginate_month(request, room_id, start, end)
+        return paginator.get_paginated_response(page)
+
+
+class UnreadCountsView(APIView):
+    """
+    Unread message counts for every group of the current user, read from
+    the maintained counters in one query
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        return Response({'results': unread_counts(request.user)})
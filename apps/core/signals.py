@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from apps.core.authcache import invalidate_user
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Drop a saved or deleted user from the websocket auth cache (covers
+    deactivation and password changes).
+    
+    Runs after commit: invalidating earlier lets a socket that connects in
+    between re-cache the old row for WS_AUTH_CACHE_TTL. Bulk
+    User.objects.update(is_active=...) sends no signals and bypasses this;
+    call invalidate_user() for those ids.
+    """
+    pk = instance.pk
+    transaction.on_commit(lambda: invalidate_user(pk))
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+class MessagingConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.messaging'
+    
+    def import_models(self):
+        super().import_models()
+        # Read-cursor models live outside models.py; load them with the rest
+        # so the registry and makemigrations see them without the signals
+        from apps.messaging import readcursors  # noqa: F401
+    
+    def ready(self):
+        # Register signal receivers
+        from apps.messaging import signals  # noqa: F401
@@ -0,0 +1,52 @@
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+class GroupMessageSequence(models.Model):
+    """
+    Number of messages ever posted in a group; bumped once per group for
+    each batch of new messages (see apps.messaging.readstate)
+    """
+    group = models.OneToOneField(
+        'messaging.IslamicMessagingGroup',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='message_sequence'
+    )
+    last_seq = models.BigIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.group_id}: {self.last_seq} messages"
+
+
+class GroupReadCursor(models.Model):
+    """
+    How far a member has read in a messaging group. The unread count is
+    the group's last_seq minus the cursor's last_seen_seq, so new messages
+    never touch the members' cursors.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='read_cursors')
+    group = models.ForeignKey(
+        'messaging.IslamicMessagingGroup',
+        on_delete=models.CASCADE,
+        related_name='read_cursors'
+    )
+    last_seen_seq = models.BigIntegerField(default=0)
+    last_read_at = models.DateTimeField(null=True, blank=True)
+    last_read_message_id = models.BigIntegerField(null=True, blank=True)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'group'], name='groupreadcursor_user_group_uniq'),
+        ]
+        indexes = [
+            # Cursors are deleted per group when members are removed or cleared
+            models.Index(fields=['group', 'user'], name='groupreadcursor_group_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} in {self.group_id}: seen {self.last_seen_seq}"
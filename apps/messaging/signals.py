@@ -0,0 +1,53 @@
+from django.db.models.signals import m2m_changed
+from django.dispatch import receiver
+from apps.messaging.membership import member_through, notify_membership_change
+from apps.messaging.models import IslamicMessagingGroup
+from apps.messaging.readstate import create_read_cursors, delete_read_cursors, delete_user_read_cursors
+
+
+@receiver(m2m_changed, sender=IslamicMessagingGroup.members.through)
+def broadcast_membership_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # Keeps the chat consumers' MembershipCache in step with group.members
+    if not reverse:
+        if action == 'post_add':
+            notify_membership_change(instance.pk, added=pk_set)
+        elif action == 'post_remove':
+            notify_membership_change(instance.pk, removed=pk_set)
+        elif action == 'post_clear':
+            notify_membership_change(instance.pk, reload=True)
+        return
+    
+    # user.<groups>.add/remove/clear: pk_set holds group ids
+    if action == 'pre_clear':
+        _, group_field, user_field = member_through()
+        instance._cleared_group_ids = list(
+            sender.objects.filter(**{f'{user_field}_id': instance.pk})
+            .values_list(f'{group_field}_id', flat=True)
+        )
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        group_ids = pk_set if action != 'post_clear' else getattr(instance, '_cleared_group_ids', [])
+        change = 'added' if action == 'post_add' else 'removed'
+        for group_id in group_ids:
+            notify_membership_change(group_id, **{change: [instance.pk]})
+
+
+@receiver(m2m_changed, sender=IslamicMessagingGroup.members.through)
+def sync_read_cursors(sender, instance, action, reverse, pk_set, **kwargs):
+    # Members get a read cursor on joining and lose it on leaving
+    if not reverse:
+        if action == 'post_add':
+            create_read_cursors(instance.pk, pk_set)
+        elif action == 'post_remove':
+            delete_read_cursors(instance.pk, pk_set)
+        elif action == 'post_clear':
+            delete_read_cursors(instance.pk)
+        return
+    
+    # user.<groups>.add/remove/clear: pk_set holds group ids
+    if action == 'post_add':
+        for group_id in pk_set:
+            create_read_cursors(group_id, [instance.pk])
+    elif action == 'post_remove':
+        delete_user_read_cursors(instance.pk, pk_set)
+    elif action == 'post_clear':
+        delete_user_read_cursors(instance.pk)
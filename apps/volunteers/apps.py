@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+class VolunteersConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'apps.volunteers'
+    
+    def ready(self):
+        # Register signal receivers
+        from apps.volunteers import signals  # noqa: F401
@@ -0,0 +1,67 @@
+from datetime import timedelta
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from apps.volunteers.models import Volunteer, VolunteerTask
+from apps.volunteers.views import VolunteerDetailView, volunteer_dashboard
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Touch the related objects the real templates use, so a missing
+# select_related shows up as an extra query
+TASK_LIST = '{% for task in tasks %}{{ task.title }} {{ task.status }}{% endfor %}'
+TEMPLATES = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'OPTIONS': {
+        'loaders': [('django.template.loaders.locmem.Loader', {
+            'volunteers/dashboard.html': '{{ volunteer.user.username }} {{ group.name }} ' + TASK_LIST,
+            'volunteers/detail.html': '{{ volunteer.user.username }} {{ group.name }} ' + TASK_LIST,
+        })],
+    },
+}]
+
+
+@override_settings(CACHES=LOCMEM_CACHE, TEMPLATES=TEMPLATES)
+class VolunteerPageQueryTests(TestCase):
+    """
+    Query budgets of the volunteer pages: one query for the volunteer with
+    its user and group, one for the task slice, none once the slice is cached.
+    """
+    
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.user = User.objects.create_user(username='vol', email='vol@example.com', password='x')
+        self.volunteer = Volunteer.objects.create(user=self.user, volunteer_id='VOL-00001')
+        due = timezone.now() + timedelta(days=7)
+        for index in range(30):
+            VolunteerTask.objects.create(
+                volunteer=self.volunteer, title=f'Task {index}', description='', due_date=due
+            )
+    
+    def get(self, path):
+        request = self.factory.get(path)
+        request.user = self.user
+        return request
+    
+    def test_dashboard_query_count(self):
+        with self.assertNumQueries(2):
+            response = volunteer_dashboard(self.get('/volunteers/dashboard/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Task 29')
+        
+        with self.assertNumQueries(1):
+            volunteer_dashboard(self.get('/volunteers/dashboard/'))
+    
+    def test_detail_query_count(self):
+        view = VolunteerDetailView.as_view()
+        with self.assertNumQueries(2):
+            response = view(self.get('/volunteers/1/'), pk=self.volunteer.pk)
+            response.render()
+        self.assertContains(response, 'vol')
+        
+        with self.assertNumQueries(1):
+            view(self.get('/volunteers/1/'), pk=self.volunteer.pk).render()
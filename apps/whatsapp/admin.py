@@ -0,0 +1,16 @@
+from django.contrib import admin
+from apps.whatsapp.models import WhatsAppDeadLetter
+from apps.whatsapp.tasks import enqueue_message
+
+@admin.register(WhatsAppDeadLetter)
+class WhatsAppDeadLetterAdmin(admin.ModelAdmin):
+    list_display = ['user', 'attempts', 'error', 'created_at', 'resolved']
+    list_filter = ['resolved', 'created_at']
+    search_fields = ['user__email', 'error']
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected messages')
+    def requeue(self, request, queryset):
+        for dead_letter in queryset.filter(resolved=False, user__isnull=False):
+            enqueue_message([dead_letter.user_id], dead_letter.message_text)
+        queryset.update(resolved=True)
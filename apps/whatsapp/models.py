@@ -0,0 +1,22 @@
+from django.db import models
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+class WhatsAppDeadLetter(models.Model):
+    """
+    Outbound WhatsApp message that still failed after all retries
+    """
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='whatsapp_dead_letters')
+    message_text = models.TextField()
+    error = models.TextField(blank=True)
+    attempts = models.IntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    resolved = models.BooleanField(default=False)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Dead letter #{self.pk} for user {self.user_id}"
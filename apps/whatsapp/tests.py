@@ -0,0 +1,77 @@
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from config.celery import app
+from apps.whatsapp.models import WhatsAppDeadLetter
+from apps.whatsapp.tasks import enqueue_message, send_whatsapp_messages, throughput
+
+User = get_user_model()
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def minute_total(status):
+    return sum(count for _, count in throughput(status, minutes=5))
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SendWhatsAppMessagesTests(TestCase):
+    """
+    Runs the send task eagerly against the in-memory broker, with the
+    WhatsApp API replaced by a stub.
+    """
+    
+    def setUp(self):
+        previous = (app.conf.broker_url, app.conf.task_always_eager)
+        app.conf.broker_url = 'memory://'
+        app.conf.task_always_eager = True
+        self.addCleanup(self.restore_celery, previous)
+        cache.clear()
+        
+        self.ok_user = User.objects.create_user(username='ok', email='ok@example.com', password='x')
+        self.bad_user = User.objects.create_user(username='bad', email='bad@example.com', password='x')
+    
+    def restore_celery(self, previous):
+        app.conf.broker_url, app.conf.task_always_eager = previous
+    
+    def stub_send_bulk(self, users, message_text):
+        return {
+            user.id: (
+                {'status': 'failed', 'error': 'HTTP 500'} if user.id == self.bad_user.id
+                else {'status': 'sent', 'error': None}
+            )
+            for user in users
+        }
+    
+    def test_enqueue_message_sends_after_commit(self):
+        with mock.patch('apps.whatsapp.tasks.WhatsAppService.send_bulk', autospec=True) as send_bulk:
+            send_bulk.side_effect = lambda service, users, text: {
+                user.id: {'status': 'sent', 'error': None} for user in users
+            }
+            with self.captureOnCommitCallbacks(execute=True):
+                enqueue_message([self.ok_user.id], 'Salam')
+        
+        send_bulk.assert_called_once()
+        self.assertEqual(minute_total('sent'), 1)
+        self.assertFalse(WhatsAppDeadLetter.objects.exists())
+    
+    def test_failed_recipient_is_retried_then_dead_lettered(self):
+        with mock.patch('apps.whatsapp.tasks.WhatsAppService.send_bulk', autospec=True) as send_bulk:
+            send_bulk.side_effect = lambda service, users, text: self.stub_send_bulk(users, text)
+            send_whatsapp_messages.apply(args=([self.ok_user.id, self.bad_user.id], 'Salam'))
+        
+        attempts = send_whatsapp_messages.max_retries + 1
+        self.assertEqual(send_bulk.call_count, attempts)
+        # Retries only carry the recipients that failed
+        for call in send_bulk.call_args_list[1:]:
+            self.assertEqual([user.id for user in call.args[1]], [self.bad_user.id])
+        
+        dead_letter = WhatsAppDeadLetter.objects.get()
+        self.assertEqual(dead_letter.user_id, self.bad_user.id)
+        self.assertEqual(dead_letter.attempts, attempts)
+        self.assertEqual(dead_letter.error, 'HTTP 500')
+        
+        self.assertEqual(minute_total('sent'), 1)
+        self.assertEqual(minute_total('failed'), attempts)
+        self.assertEqual(minute_total('dead_lettered'), 1)
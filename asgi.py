@@ -1,16 +1,22 @@
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-import apps.messaging.routing
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
+# Set up Django before importing anything that touches models
 django_asgi_app = get_asgi_application()
 
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+from django.conf import settings  # noqa: E402
+from apps.messaging.wsauth import CachedAuthMiddlewareStack  # noqa: E402
+import apps.messaging.routing  # noqa: E402
+
+auth_stack = CachedAuthMiddlewareStack if settings.WS_CACHED_AUTH else AuthMiddlewareStack
+
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
-    "websocket": AuthMiddlewareStack(
+    "websocket": auth_stack(
         URLRouter(
             apps.messaging.routing.websocket_urlpatterns
         )
@@ -0,0 +1,96 @@
+import threading
+import time
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, _get_user_session_key, load_backend,
+)
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+
+
+class LocalTTLCache:
+    """
+    Small per-process cache with a short TTL, shared by the pool threads.
+    Other processes see a change at most `ttl` seconds late.
+    """
+    
+    def __init__(self, ttl, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+    
+    def set(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.max_size:
+                self._entries.clear()
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+    
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_users = LocalTTLCache(settings.WS_AUTH_LOCAL_TTL)
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    cache.delete(user_cache_key(user_id))
+    local_users.delete(str(user_id))
+
+
+def cached_user(user_id, backend_path):
+    """
+    User for a session: in-process cache, then the shared cache, then the
+    auth backend (which also rejects inactive users). Returns None if the
+    user cannot log in.
+    """
+    key = str(user_id)
+    user = local_users.get(key)
+    if user is None:
+        user = cache.get(user_cache_key(key))
+        if user is None:
+            user = load_backend(backend_path).get_user(user_id)
+            if user is None:
+                return None
+            cache.set(user_cache_key(key), user, settings.WS_AUTH_CACHE_TTL)
+        local_users.set(key, user)
+    return user
+
+
+def session_user(session):
+    """
+    django.contrib.auth.get_user() for a session, resolved through the user
+    caches. The session auth hash is still checked, so a password change
+    logs other sessions out.
+    """
+    try:
+        user_id = _get_user_session_key(session)
+        backend_path = session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return AnonymousUser()
+    if backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return AnonymousUser()
+    
+    user = cached_user(user_id, backend_path)
+    if user is None:
+        return AnonymousUser()
+    session_hash = session.get(HASH_SESSION_KEY)
+    if not session_hash or not constant_time_compare(session_hash, user.get_session_auth_hash()):
+        return AnonymousUser()
+    return user
@@ -0,0 +1,277 @@
+"""
+Websocket load benchmark for ChatConsumer.
+
+Serves the ASGI application from config/asgi.py in-process against the
+in-memory channel layer in benchmarks/settings.py, connects many
+authenticated clients across many rooms, has one client per room send
+messages and measures how long every member takes to receive them.
+
+    python -m benchmarks.chat_load --clients 2000 --rooms 50 --messages 10 --output chat_load.json
+
+With --workers W, W processes share the clients of one prepared fixture
+(--prepare-only writes it) and meet at a file barrier before sending;
+a room's members are spread over the workers, so with a Redis channel
+layer every broadcast crosses processes. Times are wall-clock so
+latencies can be measured between processes. See benchmarks.shard_scaling.
+
+The JSON report carries the git commit so runs can be compared between commits.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import time
+from importlib import import_module
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from channels.testing import WebsocketCommunicator  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from apps.messaging.membership import add_members  # noqa: E402
+from apps.messaging.models import IslamicMessagingGroup  # noqa: E402
+
+User = get_user_model()
+
+
+def percentiles(samples):
+    """
+    p50/p90/p99/max of a list of seconds, in milliseconds
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 3)
+
+    return {
+        'p50': pick(0.50),
+        'p90': pick(0.90),
+        'p99': pick(0.99),
+        'max': round(ordered[-1] * 1000, 3),
+        'count': len(ordered),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_database(clients, rooms):
+    """
+    Create one user and session per client and the chat rooms; client i is
+    a member of room i % rooms. Returns (session keys, room ids).
+    """
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    User.objects.filter(username__startswith='bench-').delete()
+
+    User.objects.bulk_create([
+        User(username=f'bench-{index}', email=f'bench-{index}@example.com')
+        for index in range(clients)
+    ])
+    users = list(User.objects.filter(username__startswith='bench-').order_by('id'))
+    rooms = [
+        IslamicMessagingGroup.objects.create(
+            name=f'Bench room {index}', group_type='volunteer', creator=users[0],
+        ).id
+        for index in range(rooms)
+    ]
+    groups = IslamicMessagingGroup.objects.in_bulk(rooms)
+    for offset, room_id in enumerate(rooms):
+        add_members(groups[room_id], users[offset::len(rooms)])
+
+    session_store = import_module(settings.SESSION_ENGINE).SessionStore
+    session_keys = []
+    for user in users:
+        session = session_store()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        session_keys.append(session.session_key)
+    return session_keys, rooms
+
+
+class Client:
+    def __init__(self, application, room_id, session_key):
+        self.room_id = room_id
+        self.communicator = WebsocketCommunicator(
+            application,
+            f'/ws/chat/{room_id}/',
+            headers=[(b'cookie', f'{settings.SESSION_COOKIE_NAME}={session_key}'.encode())],
+        )
+        self.received = {}
+
+    async def connect(self):
+        started = time.perf_counter()
+        connected, _ = await self.communicator.connect(timeout=30)
+        return connected, time.perf_counter() - started
+
+    async def listen(self, idle_timeout):
+        """
+        Record the arrival time of every chat message until the socket goes quiet.
+        """
+        while True:
+            try:
+                frame = await self.communicator.receive_from(timeout=idle_timeout)
+            except asyncio.TimeoutError:
+                return
+            data = json.loads(frame)
+            if 'message' in data:
+                self.received[data['message']] = time.time()
+
+
+def worker_of(index, rooms, workers):
+    """
+    Worker process that runs client `index`; rotates so that each room's
+    members, and the rooms' senders, are spread over all workers
+    """
+    return (index // rooms + index % rooms) % workers
+
+
+def wait_at_barrier(directory, worker, workers, timeout=300):
+    open(os.path.join(directory, f'ready-{worker}'), 'w').close()
+    deadline = time.time() + timeout
+    while len([name for name in os.listdir(directory) if name.startswith('ready-')]) < workers:
+        if time.time() > deadline:
+            raise TimeoutError('Other benchmark workers did not become ready')
+        time.sleep(0.05)
+
+
+async def run(args):
+    from config.asgi import application
+
+    if args.fixture and not args.prepare_only:
+        with open(args.fixture, encoding='utf-8') as f:
+            fixture = json.load(f)
+        session_keys, rooms = fixture['session_keys'], fixture['rooms']
+    else:
+        session_keys, rooms = await asyncio.to_thread(prepare_database, args.clients, args.rooms)
+        if args.prepare_only:
+            with open(args.fixture, 'w', encoding='utf-8') as f:
+                json.dump({'session_keys': session_keys, 'rooms': rooms}, f)
+            return None
+    
+    # Members per room across all workers, for the expected delivery count
+    members = {}
+    for index in range(len(session_keys)):
+        room_id = rooms[index % len(rooms)]
+        members[room_id] = members.get(room_id, 0) + 1
+    
+    indexes = [
+        index for index in range(len(session_keys))
+        if worker_of(index, len(rooms), args.workers) == args.worker
+    ]
+    clients = [Client(application, rooms[index % len(rooms)], session_keys[index]) for index in indexes]
+    # Client i < rooms is the first member of room i and its only sender
+    sender_clients = {client for index, client in zip(indexes, clients) if index < len(rooms)}
+
+    limit = asyncio.Semaphore(args.connect_concurrency)
+
+    async def connect(client):
+        async with limit:
+            return await client.connect()
+
+    connect_started = time.perf_counter()
+    connect_results = await asyncio.gather(*(connect(client) for client in clients))
+    connect_elapsed = time.perf_counter() - connect_started
+    connected = [client for client, (ok, _) in zip(clients, connect_results) if ok]
+
+    # Drain history frames before measuring
+    await asyncio.gather(*(client.listen(0.2) for client in connected))
+    for client in connected:
+        client.received.clear()
+    if args.barrier_dir:
+        await asyncio.to_thread(wait_at_barrier, args.barrier_dir, args.worker, args.workers)
+
+    senders = {client.room_id: client for client in connected if client in sender_clients}
+
+    sent_at = {}
+    listeners = [asyncio.ensure_future(client.listen(args.idle_timeout)) for client in connected]
+    send_started = time.time()
+    for sequence in range(args.messages):
+        for room_id, sender in senders.items():
+            # The send time travels in the nonce so other workers can time it
+            sent = time.time()
+            nonce = f'bench-{room_id}-{sequence}-{sent!r}'
+            sent_at[nonce] = (room_id, sent)
+            await sender.communicator.send_to(text_data=json.dumps({'message': nonce}))
+        if args.interval:
+            await asyncio.sleep(args.interval)
+    await asyncio.gather(*listeners)
+
+    fanout = []
+    roundtrip = []
+    last_delivery = send_started
+    for client in connected:
+        for nonce, received_at in client.received.items():
+            if not nonce.startswith('bench-'):
+                continue
+            latency = received_at - float(nonce.rsplit('-', 1)[1])
+            fanout.append(latency)
+            if senders.get(client.room_id) is client:
+                roundtrip.append(latency)
+            last_delivery = max(last_delivery, received_at)
+
+    await asyncio.gather(*(client.communicator.disconnect() for client in connected))
+
+    expected = sum(members[room_id] for room_id, _ in sent_at.values())
+    delivery_window = last_delivery - send_started
+    return {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'database': settings.DATABASES['default']['ENGINE'],
+        'params': vars(args),
+        'clients_connected': len(connected),
+        'connect_failures': len(clients) - len(connected),
+        'connects_per_sec': round(len(connected) / connect_elapsed, 1) if connect_elapsed else None,
+        'connect_ms': percentiles([elapsed for ok, elapsed in connect_results if ok]),
+        'roundtrip_ms': percentiles(roundtrip),
+        'fanout_ms': percentiles(fanout),
+        'messages_sent': len(sent_at),
+        'deliveries': len(fanout),
+        'expected_deliveries': expected,
+        'deliveries_per_sec': round(len(fanout) / delivery_window, 1) if delivery_window else None,
+        'messages_per_sec': round(len(sent_at) / delivery_window, 1) if delivery_window else None,
+        'send_started': send_started,
+        'last_delivery': last_delivery,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the ChatConsumer websocket path.')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--rooms', type=int, default=20)
+    parser.add_argument('--messages', type=int, default=10, help='Messages sent per room')
+    parser.add_argument('--interval', type=float, default=0.0, help='Pause between rounds of sends (seconds)')
+    parser.add_argument('--connect-concurrency', type=int, default=200)
+    parser.add_argument('--idle-timeout', type=float, default=2.0,
+                        help='Seconds without traffic after which a client stops listening')
+    parser.add_argument('--output', default='chat_load.json')
+    parser.add_argument('--fixture', help='Users, sessions and rooms prepared by --prepare-only')
+    parser.add_argument('--prepare-only', action='store_true', help='Write --fixture and exit')
+    parser.add_argument('--workers', type=int, default=1, help='Processes sharing the fixture')
+    parser.add_argument('--worker', type=int, default=0, help='Index of this process')
+    parser.add_argument('--barrier-dir', help='Directory the workers meet in before sending')
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    if report is None:
+        return
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+HTTP throughput of the WSGI and ASGI serving modes on the same views.
+
+Starts gunicorn from gunicorn.conf.py once per mode with the same worker
+count, drives the given paths with a fixed number of concurrent keep-alive
+clients for a fixed duration and reports requests/sec and latency.
+
+    python -m benchmarks.http_throughput --workers 4 --concurrency 64 --duration 20 --output http_throughput.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import httpx  # noqa: E402
+from django.conf import settings  # noqa: E402
+from benchmarks.chat_load import git_commit, percentiles, prepare_database  # noqa: E402
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server did not start on port {port}')
+
+
+def start_server(mode, args):
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE='benchmarks.settings',
+        SERVER_ROLE='http',
+        SERVER_MODE=mode,
+        WEB_WORKERS=str(args.workers),
+        ASGI_THREADS=str(args.asgi_threads),
+        BIND=f'127.0.0.1:{args.port}',
+    )
+    server = subprocess.Popen(
+        ['gunicorn', '--config', 'gunicorn.conf.py', '--access-logfile', '/dev/null'],
+        env=env,
+    )
+    wait_for_port(args.port)
+    return server
+
+
+async def drive(paths, cookies, args):
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + args.duration
+
+    async def client(index):
+        nonlocal errors
+        async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{args.port}', cookies=cookies) as http:
+            request = 0
+            while time.perf_counter() < deadline:
+                path = paths[(index + request) % len(paths)]
+                request += 1
+                started = time.perf_counter()
+                try:
+                    response = await http.get(path)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(index) for index in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_sec': round(len(latencies) / elapsed, 1),
+        'latency_ms': percentiles(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare WSGI and ASGI serving throughput.')
+    parser.add_argument('--modes', nargs='+', choices=['wsgi', 'asgi'], default=['wsgi', 'asgi'])
+    parser.add_argument('--paths', nargs='+', default=None,
+                        help='Paths to request (default: a room message history page)')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--asgi-threads', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--output', default='http_throughput.json')
+    args = parser.parse_args()
+
+    session_keys, rooms = prepare_database(1, 1)
+    paths = args.paths or [f'/api/messaging/rooms/{rooms[0]}/messages/']
+    cookies = {settings.SESSION_COOKIE_NAME: session_keys[0]}
+
+    results = []
+    for mode in args.modes:
+        server = start_server(mode, args)
+        try:
+            result = {'mode': mode, **asyncio.run(drive(paths, cookies, args))}
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait()
+        results.append(result)
+        print(json.dumps(result))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'commit': git_commit(), 'params': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
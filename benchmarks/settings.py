@@ -0,0 +1,61 @@
+"""
+Settings for in-process benchmarks: in-memory channel layer and caches, and a
+throwaway SQLite database unless BENCH_DATABASE=postgres selects the regular one.
+
+BENCH_REDIS_SHARDS=host1,host2:6380 switches to the Redis channel layers
+of config.settings instead, with one chat shard per host, so several
+benchmark processes share one fan-out.
+"""
+import os
+import tempfile
+from config.settings import *  # noqa: F401,F403
+
+if os.environ.get('BENCH_DATABASE', 'sqlite') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get(
+                'BENCH_SQLITE_NAME', os.path.join(tempfile.gettempdir(), 'mrs03_bench.sqlite3')
+            ),
+            # Multi-process runs write to the same file
+            'OPTIONS': {'timeout': 30},
+        }
+    }
+    DATABASE_REPLICAS = []
+
+BENCH_REDIS_SHARDS = [host for host in os.environ.get('BENCH_REDIS_SHARDS', '').split(',') if host]
+if BENCH_REDIS_SHARDS:
+    CHANNEL_LAYERS = {}
+    for shard_host in BENCH_REDIS_SHARDS:
+        shard_name, _, shard_port = shard_host.partition(':')
+        CHANNEL_LAYERS[f'chat-{shard_host}'] = {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [(shard_name, int(shard_port or 6379))], 'capacity': 10000},
+        }
+    # Per-socket channels live on the first host; rooms are spread by shard_for_room
+    CHANNEL_LAYERS['default'] = CHANNEL_LAYERS[f'chat-{BENCH_REDIS_SHARDS[0]}']
+    CHAT_CHANNEL_SHARDS = [f'chat-{host}' for host in BENCH_REDIS_SHARDS]
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+            'CONFIG': {'capacity': 10000},
+        },
+    }
+    CHAT_CHANNEL_SHARDS = []
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+CHAT_HISTORY_BACKEND = 'memory'
+CHAT_PRESENCE_BACKEND = 'memory'
+CELERY_BROKER_URL = 'memory://'
+CELERY_TASK_ALWAYS_EAGER = True
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Load generators send faster than any real client; measure the consumer, not the limiter
+CHAT_USER_RATE = 0
+CHAT_ROOM_RATE = 0
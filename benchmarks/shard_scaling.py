@@ -0,0 +1,132 @@
+"""
+Shard scaling benchmark for chat fan-out.
+
+Runs a fixed number of chat_load worker processes against one shared
+database and one Redis-backed sharded channel layer, with 1..N of the given
+Redis hosts configured as chat shards (CHAT_CHANNEL_SHARDS). Every room has
+members in every worker, so each broadcast goes through the room's shard
+(picked by shard_for_room) and crosses processes. Reports the combined
+delivery rate and fan-out latency per shard count, and how many rooms move
+when a shard is added.
+
+    python -m benchmarks.shard_scaling --redis-hosts redis-1,redis-2,redis-3,redis-4 \\
+        --workers 4 --clients 4000 --rooms 80 --output shard_scaling.json
+
+Use BENCH_DATABASE=postgres for large runs; the SQLite default serializes
+the workers' message writes.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from apps.messaging.sharding import shard_for_room  # noqa: E402
+
+
+def moved_fraction(rooms, shard_count):
+    """
+    Share of rooms that change shard when going from shard_count to shard_count + 1
+    """
+    before = [f'shard-{index}' for index in range(shard_count)]
+    after = before + [f'shard-{shard_count}']
+    moved = sum(1 for room in rooms if shard_for_room(room, before) != shard_for_room(room, after))
+    return moved / len(rooms)
+
+
+def chat_load(args, extra, env):
+    command = [
+        sys.executable, '-m', 'benchmarks.chat_load',
+        '--clients', str(args.clients),
+        '--rooms', str(args.rooms),
+        '--messages', str(args.messages),
+        *extra,
+    ]
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+
+
+def run_shards(shard_count, args, workdir, base_env):
+    hosts = args.redis_hosts[:shard_count]
+    env = {**base_env, 'BENCH_REDIS_SHARDS': ','.join(hosts)}
+    fixture = os.path.join(workdir, 'fixture.json')
+    barrier_dir = tempfile.mkdtemp(dir=workdir)
+
+    processes = []
+    for worker in range(args.workers):
+        output = os.path.join(workdir, f'{shard_count}-{worker}.json')
+        extra = [
+            '--fixture', fixture,
+            '--workers', str(args.workers),
+            '--worker', str(worker),
+            '--barrier-dir', barrier_dir,
+            '--output', output,
+        ]
+        processes.append((chat_load(args, extra, env), output))
+
+    reports = []
+    for process, output in processes:
+        if process.wait() != 0:
+            raise RuntimeError(f'Benchmark worker failed with exit code {process.returncode}')
+        with open(output, encoding='utf-8') as f:
+            reports.append(json.load(f))
+
+    with open(fixture, encoding='utf-8') as f:
+        rooms = json.load(f)['rooms']
+    shards = [f'chat-{host}' for host in hosts]
+    rooms_per_shard = {shard: 0 for shard in shards}
+    for room_id in rooms:
+        rooms_per_shard[shard_for_room(room_id, shards)] += 1
+
+    deliveries = sum(report['deliveries'] for report in reports)
+    window = max(report['last_delivery'] for report in reports) - min(report['send_started'] for report in reports)
+    return {
+        'shards': shard_count,
+        'workers': args.workers,
+        'rooms_per_shard': list(rooms_per_shard.values()),
+        'deliveries': deliveries,
+        'expected_deliveries': sum(report['expected_deliveries'] for report in reports),
+        'deliveries_per_sec': round(deliveries / window, 1) if window else None,
+        'fanout_p99_ms': max((report['fanout_ms'] or {}).get('p99', 0) for report in reports),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure chat fan-out throughput as shards are added.')
+    parser.add_argument('--redis-hosts', required=True,
+                        help='Comma-separated Redis hosts, one per shard (host or host:port)')
+    parser.add_argument('--workers', type=int, default=4, help='chat_load processes sharing the layer')
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--rooms', type=int, default=40)
+    parser.add_argument('--messages', type=int, default=10)
+    parser.add_argument('--output', default='shard_scaling.json')
+    args = parser.parse_args()
+    args.redis_hosts = [host for host in args.redis_hosts.split(',') if host]
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        base_env = {**os.environ, 'BENCH_SQLITE_NAME': os.path.join(workdir, 'bench.sqlite3')}
+        # Users, sessions and rooms are created once and shared by every run
+        fixture = os.path.join(workdir, 'fixture.json')
+        preparing = chat_load(args, ['--prepare-only', '--fixture', fixture], base_env)
+        if preparing.wait() != 0:
+            raise RuntimeError('Preparing the benchmark database failed')
+
+        for shard_count in range(1, len(args.redis_hosts) + 1):
+            result = run_shards(shard_count, args, workdir, base_env)
+            result['rooms_moved_on_next_shard'] = round(moved_fraction(range(10000), shard_count), 3)
+            results.append(result)
+            print(json.dumps(result))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'params': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Cold-start profile per process type.
+
+Starts a fresh interpreter with `python -X importtime` for each process type,
+reports wall-clock startup, the slowest modules by cumulative import time and
+whether the websocket/REST stacks were loaded, and checks each against its
+target.
+
+    python -m benchmarks.startup_profile --repeat 3 --top 15 --output startup_profile.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Code each process type runs to reach "ready"; DJANGO_PROCESS_TYPE selects the app set
+PROCESS_TYPES = {
+    'wsgi': ('web', 'import config.wsgi; from django.urls import get_resolver; get_resolver().url_patterns'),
+    'asgi': ('web', 'import config.asgi; from django.urls import get_resolver; get_resolver().url_patterns'),
+    'worker': ('worker', 'from config.celery import app; import django; django.setup(); app.loader.import_default_modules()'),
+    'command': ('command', 'import django; django.setup(); from django.core.management import get_commands; get_commands()'),
+}
+
+# Cold-start budgets in milliseconds
+TARGET_MS = {
+    'wsgi': 1500,
+    'asgi': 1800,
+    'worker': 1000,
+    'command': 600,
+}
+
+# Packages that only HTTP/websocket processes should import
+WEB_ONLY_PACKAGES = ('daphne', 'channels', 'rest_framework', 'corsheaders', 'twisted', 'httpx')
+
+
+def parse_importtime(stderr):
+    """
+    {module: (self_us, cumulative_us)} from -X importtime output
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def profile(process_type, args):
+    django_process_type, code = PROCESS_TYPES[process_type]
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE=args.settings,
+        DJANGO_PROCESS_TYPE=django_process_type,
+    )
+    
+    wall_ms = []
+    modules = {}
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            env=env, capture_output=True, text=True,
+        )
+        wall_ms.append((time.perf_counter() - started) * 1000)
+        if result.returncode:
+            raise RuntimeError(f'{process_type} failed to start:\n{result.stderr[-2000:]}')
+        modules = parse_importtime(result.stderr)
+    
+    slowest = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    startup_ms = round(statistics.median(wall_ms), 1)
+    return {
+        'process_type': process_type,
+        'startup_ms': startup_ms,
+        'target_ms': TARGET_MS[process_type],
+        'within_target': startup_ms <= TARGET_MS[process_type],
+        'modules_imported': len(modules),
+        'web_only_packages': sorted(
+            package for package in WEB_ONLY_PACKAGES if package in modules
+        ),
+        'slowest': [
+            {'module': name, 'self_ms': self_us / 1000, 'cumulative_ms': cumulative_us / 1000}
+            for name, (self_us, cumulative_us) in slowest
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure import time and cold start per process type.')
+    parser.add_argument('--types', nargs='+', choices=sorted(PROCESS_TYPES), default=list(PROCESS_TYPES))
+    parser.add_argument('--settings', default='config.settings')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--output', default='startup_profile.json')
+    args = parser.parse_args()
+
+    results = []
+    for process_type in args.types:
+        result = profile(process_type, args)
+        results.append(result)
+        print(json.dumps({key: value for key, value in result.items() if key != 'slowest'}))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'params': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
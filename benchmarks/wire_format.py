@@ -0,0 +1,79 @@
+"""
+Wire format benchmark for chat broadcasts.
+
+Compares bytes on the wire and CPU per broadcast for the old behaviour
+(json.dumps of the event once per recipient), JSON encoded once per
+group_send, and the compact msgpack frame.
+
+    python -m benchmarks.wire_format --recipients 500 --broadcasts 2000 --output wire_format.json
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from apps.messaging import wire  # noqa: E402
+from apps.messaging.history import message_event  # noqa: E402
+
+
+def per_recipient_json(event, sender_id, created_at, recipients):
+    frames = []
+    for _ in range(recipients):
+        frames.append(json.dumps({'type': 'chat_message', **event}))
+    return frames
+
+
+def encode_once(wire_format):
+    def broadcast(event, sender_id, created_at, recipients):
+        frame = wire.chat_message_frames(event, sender_id, created_at)[wire_format]
+        return [frame] * recipients
+    return broadcast
+
+
+def measure(name, broadcast, args):
+    created_at = datetime.now(timezone.utc)
+    event = message_event('x' * args.message_size, 'volunteer_user_0042', created_at)
+
+    started = time.process_time()
+    for _ in range(args.broadcasts):
+        frames = broadcast(event, 42, created_at, args.recipients)
+    cpu = time.process_time() - started
+
+    frame_bytes = len(frames[0].encode() if isinstance(frames[0], str) else frames[0])
+    return {
+        'format': name,
+        'frame_bytes': frame_bytes,
+        'bytes_per_broadcast': frame_bytes * args.recipients,
+        'cpu_us_per_broadcast': round(cpu / args.broadcasts * 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare chat broadcast encodings.')
+    parser.add_argument('--recipients', type=int, default=500)
+    parser.add_argument('--broadcasts', type=int, default=2000)
+    parser.add_argument('--message-size', type=int, default=80)
+    parser.add_argument('--output', default='wire_format.json')
+    args = parser.parse_args()
+
+    results = [
+        measure('json_per_recipient', per_recipient_json, args),
+        measure('json_once', encode_once(wire.JSON), args),
+        measure('msgpack_once', encode_once(wire.MSGPACK), args),
+    ]
+    for result in results:
+        print(json.dumps(result))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'params': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
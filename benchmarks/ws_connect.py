@@ -0,0 +1,94 @@
+"""
+Websocket connect rate with the default and the cached auth stacks.
+
+Connects the same set of authenticated clients three times: through
+channels' AuthMiddlewareStack on database sessions, through
+CachedAuthMiddlewareStack with cold caches, and again with warm caches
+(a reconnect storm after a deploy).
+
+    python -m benchmarks.ws_connect --clients 2000 --rooms 20 --output ws_connect.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'benchmarks.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+import apps.messaging.routing  # noqa: E402
+from apps.core.authcache import local_users  # noqa: E402
+from apps.messaging.wsauth import CachedAuthMiddlewareStack  # noqa: E402
+from benchmarks.chat_load import Client, git_commit, percentiles, prepare_database  # noqa: E402
+
+MODES = {
+    'db_sessions': ('django.contrib.sessions.backends.db', AuthMiddlewareStack, True),
+    'cached_cold': ('django.contrib.sessions.backends.cached_db', CachedAuthMiddlewareStack, True),
+    'cached_warm': ('django.contrib.sessions.backends.cached_db', CachedAuthMiddlewareStack, False),
+}
+
+
+async def connect_all(application, session_keys, rooms, args):
+    clients = [
+        Client(application, rooms[index % len(rooms)], session_key)
+        for index, session_key in enumerate(session_keys)
+    ]
+    limit = asyncio.Semaphore(args.connect_concurrency)
+
+    async def connect(client):
+        async with limit:
+            return await client.connect()
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(connect(client) for client in clients))
+    elapsed = time.perf_counter() - started
+
+    connected = [client for client, (ok, _) in zip(clients, results) if ok]
+    await asyncio.gather(*(client.communicator.disconnect() for client in connected))
+    return {
+        'connected': len(connected),
+        'failures': len(clients) - len(connected),
+        'connects_per_sec': round(len(connected) / elapsed, 1) if elapsed else None,
+        'connect_ms': percentiles([seconds for ok, seconds in results if ok]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare websocket connect rates across auth stacks.')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--rooms', type=int, default=20)
+    parser.add_argument('--connect-concurrency', type=int, default=200)
+    parser.add_argument('--output', default='ws_connect.json')
+    args = parser.parse_args()
+
+    # cached_db writes sessions to the database too, so every mode can read them
+    with override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db'):
+        session_keys, rooms = prepare_database(args.clients, args.rooms)
+
+    results = []
+    for mode, (session_engine, auth_stack, cold) in MODES.items():
+        if cold:
+            cache.clear()
+            local_users.clear()
+        application = ProtocolTypeRouter({
+            'websocket': auth_stack(URLRouter(apps.messaging.routing.websocket_urlpatterns)),
+        })
+        with override_settings(SESSION_ENGINE=session_engine):
+            result = {'mode': mode, **asyncio.run(connect_all(application, session_keys, rooms, args))}
+        results.append(result)
+        print(json.dumps(result))
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'commit': git_commit(), 'params': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,43 @@
+import argparse
 import csv
-import requests
-import sys
+import json
 import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Configuration
 API_URL = "http://localhost:8000/api/register"
 DEFAULT_CSV_FILE = "students.csv"
+REQUIRED_HEADERS = {'name', 'email', 'password'}
+
+# High-throughput mode
+DEFAULT_CONCURRENCY = 16
+DEFAULT_RETRIES = 5
+DEFAULT_BACKOFF = 0.5      # seconds, doubled on every retry
+DEFAULT_TIMEOUT = 10       # seconds per request
+CHECKPOINT_EVERY = 100     # rows between checkpoint writes
+
+
+def build_payload(row):
+    return {
+        "name": row['name'].strip(),
+        "email": row['email'].strip(),
+        "password": row['password'].strip(),
+        "role": "Student"  # Enforce Student role for this import
+    }
+
+
+def has_required_headers(reader):
+    if not reader.fieldnames or not REQUIRED_HEADERS.issubset(set(reader.fieldnames)):
+        print(f"Error: CSV file must contain the following headers: {', '.join(REQUIRED_HEADERS)}")
+        return False
+    return True
+
 
 def bulk_import(csv_file_path):
     if not os.path.exists(csv_file_path):
@@ -14,27 +46,20 @@ def bulk_import(csv_file_path):
         return
 
     print(f"--- Starting Bulk Import from {csv_file_path} ---")
-    
+
     success_count = 0
     fail_count = 0
 
     try:
         with open(csv_file_path, mode='r', newline='', encoding='utf-8') as file:
             reader = csv.DictReader(file)
-            
+
             # Validate headers
-            required_headers = {'name', 'email', 'password'}
-            if not reader.fieldnames or not required_headers.issubset(set(reader.fieldnames)):
-                print(f"Error: CSV file must contain the following headers: {', '.join(required_headers)}")
+            if not has_required_headers(reader):
                 return
 
             for row in reader:
-                payload = {
-                    "name": row['name'].strip(),
-                    "email": row['email'].strip(),
-                    "password": row['password'].strip(),
-                    "role": "Student"  # Enforce Student role for this import
-                }
+                payload = build_payload(row)
 
                 try:
                     response = requests.post(API_URL, json=payload)
@@ -53,7 +78,216 @@ def bulk_import(csv_file_path):
 
     print(f"\n--- Import Summary ---\nSuccessful: {success_count}\nFailed:     {fail_count}")
 
+
+class Checkpoint:
+    """
+    Tracks which CSV rows have been fully processed.
+
+    Requests complete out of order, so the state is the contiguous prefix of
+    finished rows (`next_row`) plus the finished rows past it; on resume all
+    of them are skipped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.next_row = 0
+        self.success_count = 0
+        self.fail_count = 0
+        self._done = set()
+        self._since_save = 0
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                state = json.load(f)
+            self.next_row = state['next_row']
+            self.success_count = state['success']
+            self.fail_count = state['failed']
+            self._done = set(state.get('done', []))
+
+    def is_done(self, index):
+        return index < self.next_row or index in self._done
+
+    def mark(self, index, ok):
+        with self._lock:
+            if ok:
+                self.success_count += 1
+            else:
+                self.fail_count += 1
+            self._done.add(index)
+            while self.next_row in self._done:
+                self._done.remove(self.next_row)
+                self.next_row += 1
+            self._since_save += 1
+            if self._since_save >= CHECKPOINT_EVERY:
+                self._save()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'next_row': self.next_row,
+                'success': self.success_count,
+                'failed': self.fail_count,
+                'done': sorted(self._done),
+            }, f)
+        os.replace(tmp_path, self.path)
+        self._since_save = 0
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+_local = threading.local()
+
+
+def get_session(retries, backoff):
+    """
+    Return this thread's keep-alive session, creating it on first use.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        # Registrations are not idempotent: only retry when the request never
+        # reached the server (connection errors) or was rejected unprocessed (429)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=0,
+            other=0,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=[429],
+            allowed_methods=['POST'],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        # One worker thread uses one connection at a time
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _local.session = session
+    return session
+
+
+def post_student(payload, retries, backoff, timeout):
+    """
+    Send one registration. Returns (ok, message) and never raises.
+    """
+    session = get_session(retries, backoff)
+    try:
+        response = session.post(API_URL, json=payload, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        return False, f"request error: {e}"
+
+    if response.status_code == 200:
+        return True, None
+    try:
+        message = response.json().get('message', 'Unknown error')
+    except ValueError:
+        message = f"HTTP {response.status_code}"
+    return False, message
+
+
+def bulk_import_concurrent(csv_file_path, concurrency=DEFAULT_CONCURRENCY, checkpoint_path=None,
+                           retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, timeout=DEFAULT_TIMEOUT):
+    """
+    High-throughput import: pooled keep-alive sessions, at most `concurrency`
+    requests in flight, retries with exponential backoff and a checkpoint
+    file so an interrupted run resumes where it stopped.
+    """
+    if not os.path.exists(csv_file_path):
+        print(f"Error: File '{csv_file_path}' not found.")
+        print("Please create a CSV file with headers: name, email, password")
+        return
+
+    checkpoint = Checkpoint(checkpoint_path or f"{csv_file_path}.checkpoint")
+    if checkpoint.next_row:
+        print(f"--- Resuming Bulk Import from {csv_file_path} at row {checkpoint.next_row + 1} ---")
+    else:
+        print(f"--- Starting Bulk Import from {csv_file_path} ({concurrency} in flight) ---")
+
+    def handle_result(future):
+        index, email = in_flight.pop(future)
+        ok, message = future.result()
+        if ok:
+            print(f"[SUCCESS] Imported: {email}")
+        else:
+            print(f"[FAILED]  {email} - {message}")
+        checkpoint.mark(index, ok)
+
+    in_flight = {}
+    completed = False
+    try:
+        with open(csv_file_path, mode='r', newline='', encoding='utf-8') as file, \
+                ThreadPoolExecutor(max_workers=concurrency) as executor:
+            reader = csv.DictReader(file)
+            if not has_required_headers(reader):
+                return
+
+            for index, row in enumerate(reader):
+                if checkpoint.is_done(index):
+                    continue
+                if len(in_flight) >= concurrency:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        handle_result(future)
+
+                payload = build_payload(row)
+                future = executor.submit(post_student, payload, retries, backoff, timeout)
+                in_flight[future] = (index, payload['email'])
+
+            for future in list(in_flight):
+                handle_result(future)
+            completed = True
+    except KeyboardInterrupt:
+        print("\nInterrupted, saving checkpoint...")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+
+    # Leaving the executor waited for the requests still in flight; record
+    # them so a resume neither re-sends nor double-counts them
+    for future in list(in_flight):
+        if future.done() and not future.cancelled():
+            handle_result(future)
+
+    if completed:
+        checkpoint.clear()
+    else:
+        checkpoint.save()
+        print(f"Checkpoint saved to {checkpoint.path}; rerun the same command to resume.")
+
+    print(f"\n--- Import Summary ---\nSuccessful: {checkpoint.success_count}\nFailed:     {checkpoint.fail_count}")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Bulk import students through the register API.")
+    parser.add_argument('csv_file', nargs='?', default=DEFAULT_CSV_FILE)
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help=f"Requests in flight; enables the high-throughput mode (e.g. {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--checkpoint', default=None,
+                        help="Checkpoint file (default: <csv_file>.checkpoint)")
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES)
+    parser.add_argument('--backoff', type=float, default=DEFAULT_BACKOFF)
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT)
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    # Use command line argument if provided, otherwise default
-    filename = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CSV_FILE
-    bulk_import(filename)
\ No newline at end of file
+    args = parse_args(sys.argv[1:])
+    if args.concurrency or args.checkpoint:
+        bulk_import_concurrent(
+            args.csv_file,
+            concurrency=args.concurrency or DEFAULT_CONCURRENCY,
+            checkpoint_path=args.checkpoint,
+            retries=args.retries,
+            backoff=args.backoff,
+            timeout=args.timeout,
+        )
+    else:
+        bulk_import(args.csv_file)
@@ -0,0 +1,46 @@
+import time
+from django.core.cache import cache
+
+VERSION_KEY = 'volunteer:{volunteer_id}:version'
+TASK_PAGE_KEY = 'volunteer:{volunteer_id}:{version}:tasks:{before}:{limit}'
+CACHE_TIMEOUT = 60 * 5
+
+
+def cache_version(volunteer_id):
+    return cache.get_or_set(VERSION_KEY.format(volunteer_id=volunteer_id), time.time_ns(), None)
+
+
+def invalidate_volunteer(volunteer_id):
+    """
+    Retire every cached fragment of a volunteer by moving to a new version.
+    A timestamp (not a counter) keeps an evicted version key from reusing old entries.
+    """
+    cache.set(VERSION_KEY.format(volunteer_id=volunteer_id), time.time_ns(), None)
+
+
+def task_page(volunteer, before=None, limit=20):
+    """
+    Newest-first slice of a volunteer's tasks with id < before, and the cursor
+    for the next slice (None on the last one). Task ids follow assignment
+    order, so the slice is a keyset range on the (volunteer, id) index.
+    
+    Misses are filled from the primary even inside use_replica(): a lagging
+    replica would otherwise store a pre-update slice under the new version
+    and serve it to everyone, the writer included, until it expires.
+    """
+    key = TASK_PAGE_KEY.format(
+        volunteer_id=volunteer.pk,
+        version=cache_version(volunteer.pk),
+        before=before or '',
+        limit=limit,
+    )
+    page = cache.get(key)
+    if page is None:
+        tasks = volunteer.tasks.using('default').order_by('-id')
+        if before:
+            tasks = tasks.filter(id__lt=before)
+        tasks = list(tasks[:limit + 1])
+        next_cursor = tasks[limit - 1].id if len(tasks) > limit else None
+        page = (tasks[:limit], next_cursor)
+        cache.set(key, page, CACHE_TIMEOUT)
+    return page
@@ -0,0 +1,13 @@
+import os
+import sys
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# config/__init__.py imports this module in every process; only the celery
+# command itself should start with the lean worker app set
+if os.path.basename(sys.argv[0]) == 'celery':
+    os.environ.setdefault('DJANGO_PROCESS_TYPE', 'worker')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -1,5 +1,11 @@
 from django.urls import path
+from apps.core.middleware import metrics_view
+from apps.messaging.api import RoomMessageHistoryView, RoomMessageMonthView, UnreadCountsView
 
 urlpatterns = [
     # Main URL patterns will be defined here
-]
\ No newline at end of file
+    path('api/messaging/rooms/<int:room_id>/messages/', RoomMessageHistoryView.as_view(), name='room-messages'),
+    path('api/messaging/rooms/<int:room_id>/messages/month/', RoomMessageMonthView.as_view(), name='room-messages-month'),
+    path('api/messaging/unread/', UnreadCountsView.as_view(), name='unread-counts'),
+    path('metrics/', metrics_view, name='metrics'),
+]
@@ -0,0 +1,21 @@
+from uvicorn.workers import UvicornWorker
+
+
+class DjangoUvicornWorker(UvicornWorker):
+    """
+    Uvicorn worker for the Django/Channels ASGI app.
+    
+    Django does not speak the lifespan protocol, websockets get keepalive
+    pings, and on reload or shutdown open sockets are closed with 1012
+    (service restart) and their disconnect handlers get up to gunicorn's
+    graceful_timeout to finish.
+    """
+    CONFIG_KWARGS = {
+        'lifespan': 'off',
+        'ws_ping_interval': 20.0,
+        'ws_ping_timeout': 20.0,
+    }
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = self.cfg.graceful_timeout
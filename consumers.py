@@ -1,58 +1,225 @@
-import json
+import asyncio
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from apps.core.executors import db_sync_to_async
+# Counters land in the shared Redis registry, so /metrics/ on the web pool reports them
+from apps.core.metrics import registry
 from apps.messaging.models import Message, IslamicMessagingGroup
+from apps.messaging.history import message_event, recent_events, room_history
+from apps.messaging.membership import membership
+from apps.messaging.persistence import message_buffer
+from apps.messaging.presence import presence, room_presence, typing
+from apps.messaging.readstate import mark_read, record_new_messages
+from apps.messaging.sharding import shard_for_room
+from apps.messaging.throttling import RateLimiter
+from apps.messaging import wire
 
 User = get_user_model()
 
+user_limiter = RateLimiter(settings.CHAT_USER_RATE, settings.CHAT_USER_BURST)
+room_limiter = RateLimiter(settings.CHAT_ROOM_RATE, settings.CHAT_ROOM_BURST)
+
 class ChatConsumer(AsyncWebsocketConsumer):
+    async def __call__(self, scope, receive, send):
+        # Listen on the room's shard so its group messages reach this channel
+        self.channel_layer_alias = shard_for_room(scope['url_route']['kwargs']['room_id'])
+        await super().__call__(scope, receive, send)
+    
     async def connect(self):
         self.room_id = self.scope['url_route']['kwargs']['room_id']
         self.room_group_name = f'chat_{self.room_id}'
         self.user = self.scope['user']
+        self.wire_format = wire.negotiate(self.scope)
+        
+        # Resolved once here instead of on every message
+        self.group = await self.get_group()
+        if self.group is None:
+            await self.close()
+            return
+        
+        # Members only; the room's member set is loaded once per process
+        membership.acquire(self.room_id)
+        self.holds_membership = True
+        if not await membership.is_member(self.room_id, self.user.id):
+            await self.close(code=4003)
+            return
         
         await self.channel_layer.group_add(
             self.room_group_name,
             self.channel_name
         )
-        await self.accept()
+        if wire.MSGPACK in self.scope.get('subprotocols', ()):
+            await self.accept(subprotocol=wire.MSGPACK)
+        else:
+            await self.accept()
+        # Only accepted sockets join presence and announce leaving
+        self.joined = True
+        
+        history = await recent_events(self.room_id)
+        if history:
+            await self.send_payload({'type': 'history', 'messages': history})
+        
+        if self.user.is_authenticated:
+            await presence.touch(self.room_id, self.user.id, self.user.username, self.channel_name)
+            await self.broadcast_presence('online')
     
     async def disconnect(self, close_code):
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
+        if getattr(self, 'holds_membership', False):
+            membership.release(self.room_id)
+            self.holds_membership = False
+        if getattr(self, 'joined', False) and self.user.is_authenticated:
+            self.joined = False
+            # Other tabs of the same user keep them online
+            if await presence.leave(self.room_id, self.user.id, self.channel_name):
+                await self.broadcast_presence('offline')
+        await message_buffer.drain()
     
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
+        # Reject oversized frames before paying for decoding
+        frame = text_data if text_data is not None else bytes_data
+        if frame is None or len(frame) > settings.CHAT_MAX_FRAME_SIZE:
+            registry.inc('chat_dropped_total', reason='oversized')
+            await self.close(code=1009)
+            return
+        
+        # Membership can be revoked while the socket is open
+        if not await membership.is_member(self.room_id, self.user.id):
+            await self.close(code=4003)
+            return
+        
+        if not user_limiter.allow(self.user.id or self.channel_name):
+            registry.inc('chat_throttled_total', scope='user')
+            await self.send_payload({'error': 'Rate limit exceeded'})
+            return
+        
         try:
-            data = json.loads(text_data)
-        except json.JSONDecodeError:
-            await self.send(text_data=json.dumps({'error': 'Invalid JSON format'}))
+            data = wire.decode(text_data, bytes_data)
+        except ValueError:
+            await self.send_payload({'error': 'Invalid JSON format'})
+            return
+
+        # Presence and typing events never touch the database
+        event_type = data.get('type')
+        if event_type == 'heartbeat':
+            if self.user.is_authenticated:
+                await presence.touch(self.room_id, self.user.id, self.user.username, self.channel_name)
+            return
+        if event_type == 'typing':
+            if self.user.is_authenticated:
+                typing.add(self.channel_layer, self.room_group_name, self.user.username)
+            return
+        if event_type == 'presence':
+            online = await room_presence(self.room_id)
+            await self.send_payload({'type': 'presence', 'users': online})
+            return
+        if event_type == 'mark_read':
+            # Timestamp of the newest message the client has shown; default now
+            try:
+                read_at = parse_datetime(data['timestamp']) if data.get('timestamp') else None
+                message_id = int(data['message_id']) if data.get('message_id') else None
+            except (TypeError, ValueError):
+                await self.send_payload({'error': 'Invalid mark_read event'})
+                return
+            if read_at is not None and timezone.is_naive(read_at):
+                read_at = timezone.make_aware(read_at)
+            unread = await self.save_read_cursor(read_at, message_id)
+            await self.send_payload({'type': 'unread', 'group': self.group.id, 'count': unread})
             return
 
         message_content = data.get('message')
         if not message_content:
             return
         
-        message = await self.save_message(message_content)
+        if not room_limiter.allow(self.room_id):
+            registry.inc('chat_throttled_total', scope='room')
+            await self.send_payload({'error': 'Room is busy, try again shortly'})
+            return
+        
+        if settings.CHAT_WRITE_BEHIND:
+            message = Message(
+                sender=self.user, group=self.group, content=message_content,
+                created_at=timezone.now(),
+            )
+        else:
+            message = await self.save_message(message_content)
         
+        event = message_event(message_content, self.user.username, message.created_at)
+        # Encoded once here; every recipient forwards the same frame
         await self.channel_layer.group_send(
             self.room_group_name,
             {
                 'type': 'chat_message',
-                'message': message_content,
-                'sender': self.user.username,
-                'timestamp': message.created_at.isoformat(),
+                'sent_at': time.time(),
+                'frames': wire.chat_message_frames(event, self.user.id, message.created_at),
             }
         )
+        await room_history.append(self.room_id, event)
+        
+        if settings.CHAT_WRITE_BEHIND:
+            message_buffer.add(message)
     
     async def chat_message(self, event):
-        await self.send(text_data=json.dumps(event))
+        # A consumer this far behind the broadcast is too slow to keep up;
+        # closing it stops its channel-layer buffer from growing
+        if time.time() - event['sent_at'] > settings.CHAT_MAX_LAG:
+            registry.inc('chat_dropped_total', reason='slow_consumer')
+            await self.close(code=4008)
+            return
+        await self.send_frame(event['frames'][self.wire_format])
+    
+    async def presence_update(self, event):
+        await self.send_payload(event)
+    
+    async def typing_update(self, event):
+        await self.send_payload(event)
+    
+    async def membership_changed(self, event):
+        membership.apply(self.room_id, event)
+        if not await membership.is_member(self.room_id, self.user.id):
+            await self.close(code=4003)
+    
+    async def send_payload(self, payload):
+        await self.send_frame(wire.encode(payload, self.wire_format))
     
-    @database_sync_to_async
+    async def send_frame(self, frame):
+        if isinstance(frame, bytes):
+            send = self.send(bytes_data=frame)
+        else:
+            send = self.send(text_data=frame)
+        try:
+            await asyncio.wait_for(send, settings.CHAT_SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            registry.inc('chat_dropped_total', reason='send_timeout')
+            await self.close(code=4008)
+    
+    async def broadcast_presence(self, status):
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {'type': 'presence_update', 'user': self.user.username, 'status': status}
+        )
+    
+    @db_sync_to_async
+    def get_group(self):
+        return IslamicMessagingGroup.objects.filter(id=self.room_id).first()
+    
+    @db_sync_to_async
     def save_message(self, content):
-        group = IslamicMessagingGroup.objects.get(id=self.room_id)
-        return Message.objects.create(
-            sender=self.user, group=group, content=content
-        )
\ No newline at end of file
+        with transaction.atomic():
+            message = Message.objects.create(
+                sender=self.user, group=self.group, content=content
+            )
+            record_new_messages([message])
+        return message
+    
+    @db_sync_to_async
+    def save_read_cursor(self, read_at, message_id):
+        return mark_read(self.user.id, self.group.id, read_at, message_id)
@@ -0,0 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
+from channels.db import database_sync_to_async
+from django.conf import settings
+
+# One pool per process, sized by ASGI_THREADS. asgiref's default
+# thread-sensitive mode would run every ORM call on a single shared thread.
+db_executor = ThreadPoolExecutor(max_workers=settings.ASGI_THREADS, thread_name_prefix='asgi-db')
+
+
+def db_sync_to_async(func):
+    """
+    database_sync_to_async on the per-process pool; each pool thread keeps
+    its own connection, so ASGI_THREADS x workers must fit the DB's limit.
+    """
+    return database_sync_to_async(func, thread_sensitive=False, executor=db_executor)
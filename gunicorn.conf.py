@@ -0,0 +1,42 @@
+"""
+Gunicorn settings for every serving role (picked up from the working directory).
+
+SERVER_ROLE=http       plain HTTP; sync WSGI workers, or ASGI workers with SERVER_MODE=asgi
+SERVER_ROLE=websocket  ASGI workers serving ChatConsumer; always SERVER_MODE=asgi
+
+Each role runs as its own service with its own WEB_WORKERS, so websocket
+connections never compete with page requests for workers.
+"""
+import multiprocessing
+import os
+from decouple import config
+
+role = config('SERVER_ROLE', default='http')
+mode = 'asgi' if role == 'websocket' else config('SERVER_MODE', default='wsgi')
+# Settings size DB connection lifetimes from SERVER_MODE
+os.environ['SERVER_MODE'] = mode
+
+bind = config('BIND', default='0.0.0.0:8000')
+cpus = multiprocessing.cpu_count()
+
+if mode == 'asgi':
+    wsgi_app = 'config.asgi:application'
+    worker_class = 'config.workers.DjangoUvicornWorker'
+    workers = config('WEB_WORKERS', default=cpus, cast=int)
+else:
+    wsgi_app = 'config.wsgi:application'
+    workers = config('WEB_WORKERS', default=cpus * 2 + 1, cast=int)
+    threads = config('WEB_THREADS', default=1, cast=int)
+
+timeout = config('WORKER_TIMEOUT', default=60, cast=int)
+keepalive = 5
+accesslog = '-'
+
+if role == 'websocket':
+    # Sockets live for hours: never recycle on request count, and give
+    # disconnect handlers time to flush on reload (HUP) or shutdown
+    graceful_timeout = config('GRACEFUL_TIMEOUT', default=60, cast=int)
+else:
+    graceful_timeout = config('GRACEFUL_TIMEOUT', default=30, cast=int)
+    max_requests = config('MAX_REQUESTS', default=2000, cast=int)
+    max_requests_jitter = max_requests // 10
@@ -0,0 +1,138 @@
+import json
+from collections import defaultdict, deque
+import redis.asyncio as redis
+from redis.exceptions import WatchError
+from django.conf import settings
+from apps.core.executors import db_sync_to_async
+from apps.core.routers import use_replica
+from apps.messaging.models import Message
+
+
+def message_event(content, sender, timestamp):
+    """
+    Wire representation of a chat message, shared by broadcasts and history
+    """
+    return {
+        'message': content,
+        'sender': sender,
+        'timestamp': timestamp.isoformat(),
+    }
+
+
+def merge_events(loaded, current, size):
+    """
+    Events loaded from the database merged with those broadcast meanwhile:
+    each event once, oldest first, at most `size`
+    """
+    merged = {}
+    for event in list(loaded) + list(current):
+        merged.setdefault(json.dumps(event), event)
+    return sorted(merged.values(), key=lambda event: event['timestamp'])[-size:]
+
+
+class MemoryRoomHistory:
+    """
+    Per-process ring buffer of the latest events in each room
+    """
+    
+    def __init__(self, size):
+        self.size = size
+        self._rooms = defaultdict(lambda: deque(maxlen=self.size))
+    
+    async def append(self, room_id, event):
+        self._rooms[str(room_id)].append(event)
+    
+    async def extend(self, room_id, events):
+        self._rooms[str(room_id)].extend(events)
+    
+    async def recent(self, room_id):
+        return list(self._rooms.get(str(room_id), ()))
+    
+    async def fill(self, room_id, events):
+        room = self._rooms[str(room_id)]
+        merged = merge_events(events, room, self.size)
+        room.clear()
+        room.extend(merged)
+        return merged
+
+
+class RedisRoomHistory:
+    """
+    Ring buffer kept in a capped Redis list so every process sees the same history.
+    The list head is the newest event.
+    """
+    
+    KEY = 'chat:history:{room_id}'
+    
+    def __init__(self, url, size):
+        self.redis = redis.from_url(url)
+        self.size = size
+    
+    async def append(self, room_id, event):
+        await self.extend(room_id, [event])
+    
+    async def extend(self, room_id, events):
+        key = self.KEY.format(room_id=room_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.lpush(key, *[json.dumps(event) for event in events])
+            pipe.ltrim(key, 0, self.size - 1)
+            await pipe.execute()
+    
+    async def recent(self, room_id):
+        raw_events = await self.redis.lrange(self.KEY.format(room_id=room_id), 0, self.size - 1)
+        return [json.loads(raw) for raw in reversed(raw_events)]
+    
+    async def fill(self, room_id, events):
+        """
+        Seed the buffer from the database without duplicating or reordering
+        events other joiners or broadcasts added meanwhile. Retried under
+        WATCH until no one else wrote the list in between.
+        """
+        key = self.KEY.format(room_id=room_id)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    current = [json.loads(raw) for raw in reversed(await pipe.lrange(key, 0, -1))]
+                    merged = merge_events(events, current, self.size)
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.lpush(key, *[json.dumps(event) for event in merged])
+                    await pipe.execute()
+                    return merged
+                except WatchError:
+                    continue
+
+
+if settings.CHAT_HISTORY_BACKEND == 'redis':
+    room_history = RedisRoomHistory(settings.CHAT_HISTORY_REDIS_URL, settings.CHAT_HISTORY_SIZE)
+else:
+    room_history = MemoryRoomHistory(settings.CHAT_HISTORY_SIZE)
+
+
+async def recent_events(room_id):
+    """
+    Last CHAT_HISTORY_SIZE events for a room, oldest first.
+    An empty buffer (first join after a restart) is filled from the
+    database; concurrent joiners merge their loads instead of appending.
+    """
+    events = await room_history.recent(room_id)
+    if not events:
+        events = await load_recent_events(room_id, room_history.size)
+        if events:
+            events = await room_history.fill(room_id, events)
+    return events
+
+
+@db_sync_to_async
+def load_recent_events(room_id, limit):
+    with use_replica():
+        messages = list(
+            Message.objects.filter(group_id=room_id)
+            .select_related('sender')
+            .order_by('-created_at', '-id')[:limit]
+        )
+    return [
+        message_event(message.content, message.sender.username, message.created_at)
+        for message in reversed(messages)
+    ]
@@ -2,8 +2,14 @@
 import os
 import sys
 
+# Commands that need neither the websocket nor the REST stack; they start
+# with DJANGO_PROCESS_TYPE=command (see config.settings)
+LIGHT_COMMANDS = {"import_students", "partition_messages"}
+
 if __name__ == "__main__":
-    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "mrs03.settings")
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    if len(sys.argv) > 1 and sys.argv[1] in LIGHT_COMMANDS:
+        os.environ.setdefault("DJANGO_PROCESS_TYPE", "command")
     try:
         from django.core.management import execute_from_command_line
     except ImportError as exc:
@@ -0,0 +1,159 @@
+import asyncio
+import uuid
+from collections import defaultdict, deque
+from asgiref.sync import async_to_sync
+from django.db import transaction
+from apps.messaging.models import IslamicMessagingGroup
+from apps.messaging.readstate import create_read_cursors
+from apps.messaging.sharding import shard_for_room
+
+
+def member_through():
+    """
+    (through model, group FK name, user FK name) of IslamicMessagingGroup.members
+    """
+    members_field = IslamicMessagingGroup._meta.get_field('members')
+    return (
+        members_field.remote_field.through,
+        members_field.m2m_field_name(),
+        members_field.m2m_reverse_field_name(),
+    )
+
+
+def add_members(group, users):
+    """
+    Add many users (instances or ids) to a group with one INSERT.
+    Existing memberships are skipped via ON CONFLICT DO NOTHING.
+    """
+    through, group_field, user_field = member_through()
+    
+    user_ids = {getattr(user, 'pk', user) for user in users}
+    through.objects.bulk_create(
+        [through(**{f'{group_field}_id': group.pk, f'{user_field}_id': user_id}) for user_id in user_ids],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    # bulk_create skips m2m_changed, so read cursors and open sockets are handled here
+    create_read_cursors(group.pk, user_ids)
+    notify_membership_change(group.pk, added=user_ids)
+    return user_ids
+
+
+def notify_membership_change(room_id, added=(), removed=(), reload=False):
+    """
+    Send a membership change to every consumer in the room once the
+    transaction commits; each process updates its MembershipCache from it.
+    """
+    # Imported here so workers and commands that change memberships do not
+    # load the websocket stack at startup
+    from channels.layers import get_channel_layer
+    channel_layer = get_channel_layer(shard_for_room(room_id))
+    if channel_layer is None:
+        return
+    event = {
+        'type': 'membership_changed',
+        'change_id': uuid.uuid4().hex,
+        'added': list(added),
+        'removed': list(removed),
+        'reload': reload,
+    }
+    transaction.on_commit(
+        lambda: async_to_sync(channel_layer.group_send)(f'chat_{room_id}', event)
+    )
+
+
+def is_room_member(room_id, user_id):
+    through, group_field, user_field = member_through()
+    return through.objects.filter(
+        **{f'{group_field}_id': room_id, f'{user_field}_id': user_id}
+    ).exists()
+
+
+def member_ids(room_id):
+    through, group_field, user_field = member_through()
+    return set(
+        through.objects.filter(**{f'{group_field}_id': room_id})
+        .values_list(f'{user_field}_id', flat=True)
+    )
+
+
+async def load_member_ids(room_id):
+    # executors imports channels.db; only consumers get this far
+    from apps.core.executors import db_sync_to_async
+    return await db_sync_to_async(member_ids)(room_id)
+
+
+class MembershipCache:
+    """
+    Member ids of the rooms that have sockets in this process.
+    
+    A room's set is loaded once when its first socket connects and dropped
+    with the last one; in between, checks are a set lookup and changes
+    arrive as membership_changed events through the channel layer. Every
+    socket in the room relays the same event, so each change id is applied
+    once per process.
+    """
+    
+    def __init__(self, seen_size=128):
+        self._members = {}
+        self._refs = defaultdict(int)
+        self._loading = {}
+        self._stale = set()
+        self._seen = defaultdict(lambda: deque(maxlen=seen_size))
+    
+    def acquire(self, room_id):
+        self._refs[str(room_id)] += 1
+    
+    def release(self, room_id):
+        room_id = str(room_id)
+        self._refs[room_id] -= 1
+        if self._refs[room_id] <= 0:
+            for store in (self._refs, self._members, self._seen):
+                store.pop(room_id, None)
+    
+    async def is_member(self, room_id, user_id):
+        room_id = str(room_id)
+        members = self._members.get(room_id)
+        if members is None:
+            members = await self._load(room_id)
+        return user_id in members
+    
+    async def _load(self, room_id):
+        loading = self._loading.get(room_id)
+        if loading is None:
+            loading = asyncio.ensure_future(self._fetch(room_id))
+            self._loading[room_id] = loading
+            loading.add_done_callback(lambda _: self._loading.pop(room_id, None))
+        return await loading
+    
+    async def _fetch(self, room_id):
+        # Reload if a change arrived while the query was running
+        while True:
+            self._stale.discard(room_id)
+            members = await load_member_ids(room_id)
+            if room_id not in self._stale:
+                break
+        if self._refs.get(room_id):
+            self._members[room_id] = members
+        return members
+    
+    def apply(self, room_id, event):
+        room_id = str(room_id)
+        seen = self._seen[room_id]
+        if event['change_id'] in seen:
+            return
+        seen.append(event['change_id'])
+        
+        if room_id in self._loading:
+            self._stale.add(room_id)
+            return
+        if event['reload']:
+            self._members.pop(room_id, None)
+            return
+        members = self._members.get(room_id)
+        if members is not None:
+            members.update(event['added'])
+            members.difference_update(event['removed'])
+
+
+membership = MembershipCache()
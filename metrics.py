@@ -0,0 +1,201 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_request_stats = contextvars.ContextVar('request_stats', default=None)
+
+
+class MetricsRegistry:
+    """
+    Counters and summaries shared by every process, exported in the
+    Prometheus text format.
+    
+    Each process adds to local deltas, and a background thread folds them
+    into one Redis hash every `flush_interval` seconds. Any web worker can
+    then serve the same totals for the whole deployment, ws and Celery
+    processes included, and they survive worker restarts.
+    """
+    
+    KEY = 'metrics:totals'
+    
+    def __init__(self, url, flush_interval):
+        self.url = url
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = defaultdict(float)
+        self._redis = None
+        self._flusher_pid = None
+    
+    def inc(self, name, value=1, **labels):
+        if not settings.INSTRUMENTATION_ENABLED:
+            return
+        field = json.dumps(['counter', name, sorted(labels.items())])
+        with self._lock:
+            self._pending[field] += value
+        self._start_flusher()
+    
+    def observe(self, name, value, **labels):
+        if not settings.INSTRUMENTATION_ENABLED:
+            return
+        labels = sorted(labels.items())
+        count_field = json.dumps(['summary_count', name, labels])
+        sum_field = json.dumps(['summary_sum', name, labels])
+        with self._lock:
+            self._pending[count_field] += 1
+            self._pending[sum_field] += value
+        self._start_flusher()
+    
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis
+            self._redis = redis.from_url(self.url, decode_responses=True)
+        return self._redis
+    
+    def _start_flusher(self):
+        # One thread per process; a forked worker starts its own
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid != os.getpid():
+                self._flusher_pid = os.getpid()
+                self._redis = None
+                threading.Thread(target=self._flush_forever, name='metrics-flush', daemon=True).start()
+                atexit.register(self.flush)
+    
+    def _flush_forever(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+    
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(float)
+        if not pending:
+            return
+        try:
+            with self.redis.pipeline(transaction=False) as pipe:
+                for field, value in pending.items():
+                    pipe.hincrbyfloat(self.KEY, field, value)
+                pipe.execute()
+        except Exception as e:
+            # Keep the deltas for the next attempt rather than losing them
+            logger.warning(f"Could not flush metrics: {str(e)}")
+            with self._lock:
+                for field, value in pending.items():
+                    self._pending[field] += value
+    
+    def render(self):
+        self.flush()
+        counters = {}
+        summaries = defaultdict(lambda: [0, 0.0])
+        for field, value in self.redis.hgetall(self.KEY).items():
+            kind, name, labels = json.loads(field)
+            key = (name, tuple(tuple(pair) for pair in labels))
+            if kind == 'counter':
+                counters[key] = float(value)
+            elif kind == 'summary_count':
+                summaries[key][0] = int(float(value))
+            else:
+                summaries[key][1] = float(value)
+        counters = sorted(counters.items())
+        summaries = sorted(summaries.items())
+        
+        lines = []
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f'# TYPE {name} counter')
+                typed.add(name)
+            lines.append(f'{name}{_format_labels(labels)} {value}')
+        for (name, labels), (count, total) in summaries:
+            if name not in typed:
+                lines.append(f'# TYPE {name} summary')
+                typed.add(name)
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in labels
+    )
+    return '{' + pairs + '}'
+
+
+registry = MetricsRegistry(settings.INSTRUMENTATION_REDIS_URL, settings.INSTRUMENTATION_FLUSH_SECONDS)
+
+
+class RequestStats:
+    """
+    Costs accumulated while handling one request
+    """
+    
+    def __init__(self):
+        self.query_count = 0
+        self.query_time = 0.0
+        self.signatures = Counter()
+        self.http_calls = 0
+        self.http_time = 0.0
+    
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - started
+            self.query_count += 1
+            # SQL is already parameterized, so identical text means a repeated query
+            self.signatures[sql] += 1
+    
+    @property
+    def duplicate_count(self):
+        return sum(count - 1 for count in self.signatures.values() if count > 1)
+    
+    def duplicates(self, limit=5):
+        return [(sql, count) for sql, count in self.signatures.most_common(limit) if count > 1]
+
+
+def start_request():
+    return _request_stats.set(RequestStats())
+
+
+def end_request(token):
+    _request_stats.reset(token)
+
+
+def current_request_stats():
+    return _request_stats.get()
+
+
+@contextmanager
+def track_http(service):
+    """
+    Time an outbound HTTP call and charge it to the current request, if any
+    """
+    if not settings.INSTRUMENTATION_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe('outbound_http_seconds', elapsed, service=service)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.http_calls += 1
+            stats.http_time += elapsed
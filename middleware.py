@@ -0,0 +1,108 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+from apps.core.metrics import current_request_stats, end_request, registry, start_request
+from apps.core.routers import pin_to_primary, unpin
+
+slow_request_logger = logging.getLogger('mrs.slow_requests')
+
+
+class InstrumentationMiddleware:
+    """
+    Records wall time, DB query count/time, duplicate queries and outbound
+    HTTP time per view. Removes itself from the stack when
+    INSTRUMENTATION_ENABLED is off.
+    """
+    
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_request_ms = settings.INSTRUMENTATION_SLOW_REQUEST_MS
+        self.slow_sample_rate = settings.INSTRUMENTATION_SLOW_SAMPLE_RATE
+    
+    def __call__(self, request):
+        token = start_request()
+        started = time.perf_counter()
+        stats = current_request_stats()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats.record_query))
+                response = self.get_response(request)
+        finally:
+            end_request(token)
+        elapsed = time.perf_counter() - started
+        
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        registry.inc('django_requests_total', view=view, method=request.method, status=response.status_code)
+        registry.observe('django_request_seconds', elapsed, view=view)
+        registry.observe('django_db_queries', stats.query_count, view=view)
+        registry.observe('django_db_query_seconds', stats.query_time, view=view)
+        registry.inc('django_db_duplicate_queries_total', stats.duplicate_count, view=view)
+        registry.observe('django_outbound_http_seconds', stats.http_time, view=view)
+        
+        if elapsed * 1000 >= self.slow_request_ms and random.random() < self.slow_sample_rate:
+            slow_request_logger.warning(json.dumps({
+                'view': view,
+                'path': request.path,
+                'method': request.method,
+                'status': response.status_code,
+                'ms': round(elapsed * 1000, 1),
+                'queries': stats.query_count,
+                'query_ms': round(stats.query_time * 1000, 1),
+                'duplicates': stats.duplicates(),
+                'http_calls': stats.http_calls,
+                'http_ms': round(stats.http_time * 1000, 1),
+            }))
+        return response
+
+
+class ReplicaPinningMiddleware:
+    """
+    Pins reads to the primary database for write requests and, via a short-lived
+    cookie, for DATABASE_REPLICA_STICKY_SECONDS afterwards (read-your-writes).
+    Not used when no replicas are configured.
+    """
+    
+    COOKIE_NAME = 'db_primary'
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sticky_seconds = settings.DATABASE_REPLICA_STICKY_SECONDS
+    
+    def __call__(self, request):
+        is_write = request.method not in self.SAFE_METHODS
+        token = pin_to_primary(is_write or self.COOKIE_NAME in request.COOKIES)
+        try:
+            response = self.get_response(request)
+        finally:
+            unpin(token)
+        
+        if is_write:
+            response.set_cookie(
+                self.COOKIE_NAME, '1', max_age=self.sticky_seconds, httponly=True, samesite='Lax'
+            )
+        return response
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint with the totals of every process; only
+    addresses in INSTRUMENTATION_METRICS_IPS may read it
+    """
+    if not settings.INSTRUMENTATION_ENABLED:
+        return HttpResponseNotFound()
+    if request.META.get('REMOTE_ADDR') not in settings.INSTRUMENTATION_METRICS_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4')
@@ -1,9 +1,23 @@
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 
 User = get_user_model()
 
+class SkillTag(models.Model):
+    """
+    Normalized skill parsed from Volunteer.skills
+    """
+    name = models.CharField(max_length=100, unique=True)
+    
+    class Meta:
+        ordering = ['name']
+    
+    def __str__(self):
+        return self.name
+
 class Volunteer(models.Model):
     STATUS_CHOICES = [
         ('active', _('Active')),
@@ -38,8 +52,17 @@ class Volunteer(models.Model):
     whatsapp_added_to_group = models.BooleanField(default=False)
     whatsapp_added_at = models.DateTimeField(null=True, blank=True)
     
+    # Maintained by apps.volunteers.signals
+    search_vector = SearchVectorField(null=True, editable=False)
+    skill_tags = models.ManyToManyField(SkillTag, blank=True, related_name='volunteers')
+    
     class Meta:
         ordering = ['-volunteer_since']
+        indexes = [
+            # Leaderboards read the counter columns directly
+            models.Index(fields=['status', '-total_hours'], name='volunteer_leaderboard_idx'),
+            GinIndex(fields=['search_vector'], name='volunteer_search_idx'),
+        ]
     
     def __str__(self):
         return f"Volunteer: {self.user.get_full_name()}"
@@ -70,9 +93,58 @@ class VolunteerTask(models.Model):
     assigned_at = models.DateTimeField(auto_now_add=True)
     due_date = models.DateTimeField()
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Set by apps.volunteers.scheduling once a due-date reminder is queued
+    reminder_sent_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-assigned_at']
+        indexes = [
+            # Keyset slices of a volunteer's task list (see apps.volunteers.caching)
+            models.Index(fields=['volunteer', '-id'], name='volunteertask_recent_idx'),
+            # Reminder scans (see apps.volunteers.scheduling); reminded tasks drop out of it
+            models.Index(
+                fields=['status', 'due_date'],
+                condition=models.Q(reminder_sent_at__isnull=True),
+                name='volunteertask_due_idx',
+            ),
+            models.Index(fields=['volunteer', 'status'], name='volunteertask_load_idx'),
+        ]
     
     def __str__(self):
-        return f"{self.title} - {self.volunteer.user.username}"
\ No newline at end of file
+        return f"{self.title} - {self.volunteer.user.username}"
+
+class VolunteerStatsRollup(models.Model):
+    """
+    Precomputed completed-task totals per group and period
+    """
+    PERIOD_CHOICES = [
+        ('day', _('Day')),
+        ('week', _('Week')),
+        ('month', _('Month')),
+    ]
+    
+    group = models.ForeignKey(
+        'messaging.IslamicMessagingGroup',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='volunteer_stats'
+    )
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    
+    total_hours = models.IntegerField(default=0)
+    tasks_completed = models.IntegerField(default=0)
+    active_volunteers = models.IntegerField(default=0)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-period_start']
+        indexes = [
+            models.Index(fields=['group', 'period', '-period_start']),
+        ]
+    
+    def __str__(self):
+        return f"{self.group_id or 'Unassigned'} {self.period} {self.period_start}"
+
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from apps.messaging.partitions import archive_partitions, convert_to_partitioned, ensure_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = 'Manage monthly message partitions and the cold archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert', action='store_true',
+            help='One-time switch of the message table to monthly partitions'
+        )
+        parser.add_argument(
+            '--archive', action='store_true',
+            help='Export and drop partitions older than MESSAGE_HOT_MONTHS'
+        )
+
+    def handle(self, *args, **options):
+        if options['convert']:
+            if is_partitioned():
+                self.stdout.write(self.style.WARNING('Message table is already partitioned.'))
+            else:
+                convert_to_partitioned()
+                self.stdout.write(self.style.SUCCESS('Message table converted to monthly partitions.'))
+
+        if not is_partitioned():
+            self.stdout.write(self.style.ERROR('Message table is not partitioned; run with --convert first.'))
+            return
+
+        for name in ensure_partitions():
+            self.stdout.write(f'Created partition {name}')
+
+        if options['archive']:
+            for name in archive_partitions():
+                self.stdout.write(self.style.SUCCESS(f'Archived partition {name}'))
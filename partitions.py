@@ -0,0 +1,426 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+from datetime import date, datetime, time
+from celery import shared_task
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.utils import timezone
+from apps.messaging.models import Message
+
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+
+
+def add_months(day, months):
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def partition_name(month_start):
+    return f'{Message._meta.db_table}_p{month_start:%Y%m}'
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass',
+            [Message._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def secondary_indexes(cursor, table):
+    """
+    [(name, 'USING ...' part of the definition)] of a table's non-unique indexes
+    """
+    cursor.execute(
+        "SELECT index_class.relname, pg_get_indexdef(pg_index.indexrelid) FROM pg_index "
+        "JOIN pg_class index_class ON index_class.oid = pg_index.indexrelid "
+        "WHERE pg_index.indrelid = %s::regclass AND NOT pg_index.indisunique",
+        [table],
+    )
+    return [(name, definition.split(' USING ', 1)[1]) for name, definition in cursor.fetchall()]
+
+
+def prepare_legacy_table(table, legacy_end):
+    """
+    Online groundwork for convert_to_partitioned, run before the swap and
+    outside any transaction: build the indexes the partitioned table will
+    need and prove the partition bound, all without blocking chat writes.
+    """
+    group_column = Message._meta.get_field('group').column
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS "{table}_id_created_uniq" '
+            f'ON "{table}" (id, created_at)'
+        )
+        cursor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{table}_legacy_group_created_idx" '
+            f'ON "{table}" ("{group_column}", created_at DESC)'
+        )
+        # NOT VALID takes the lock only briefly; VALIDATE scans without blocking
+        # writes, and ATTACH PARTITION then trusts it instead of rescanning
+        cursor.execute(
+            f'ALTER TABLE "{table}" ADD CONSTRAINT "{table}_legacy_bound" '
+            f'CHECK (created_at IS NOT NULL AND created_at < %s) NOT VALID',
+            [legacy_end],
+        )
+        cursor.execute(f'ALTER TABLE "{table}" VALIDATE CONSTRAINT "{table}_legacy_bound"')
+
+
+def convert_to_partitioned():
+    """
+    One-time switch of the message table to monthly range partitions on
+    created_at.
+    
+    The existing table is attached as-is as the partition for everything
+    up to the end of the current month (or of its newest row, if later), so
+    no rows are copied; later months get their own partitions. The primary
+    key becomes (id, created_at), as Postgres requires the partition key in
+    every unique constraint. Foreign keys from other tables to messages can
+    then no longer be enforced and are dropped; the referencing columns keep
+    their values.
+    
+    The indexes and the bound check are built online first, so the swap
+    itself only renames, attaches and creates catalog entries.
+    """
+    table = Message._meta.db_table
+    legacy = f'{table}_legacy'
+    group_column = Message._meta.get_field('group').column
+    current = timezone.now().date().replace(day=1)
+    
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT max(created_at) FROM "{table}"')
+        newest = cursor.fetchone()[0]
+    # Bounds are in UTC, the connection's time zone. The legacy partition
+    # also takes the rest of this month, which keeps receiving writes.
+    newest_month = max(current, newest.date().replace(day=1)) if newest is not None else current
+    legacy_end = add_months(newest_month, 1)
+    prepare_legacy_table(table, legacy_end)
+    
+    with transaction.atomic(), connection.cursor() as cursor:
+        indexes = secondary_indexes(cursor, table)
+        cursor.execute(f'ALTER TABLE "{table}" RENAME TO "{legacy}"')
+        
+        cursor.execute(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+            "WHERE confrelid = %s::regclass AND contype = 'f'",
+            [legacy],
+        )
+        for referencing_table, name in cursor.fetchall():
+            logger.warning(f"Dropping foreign key {name} on {referencing_table} to partition messages")
+            cursor.execute(f'ALTER TABLE {referencing_table} DROP CONSTRAINT "{name}"')
+        
+        cursor.execute(
+            f'CREATE TABLE "{table}" (LIKE "{legacy}" INCLUDING DEFAULTS INCLUDING IDENTITY '
+            f'INCLUDING CONSTRAINTS) PARTITION BY RANGE (created_at)'
+        )
+        # The bound check is only for the legacy rows, not for future months
+        cursor.execute(f'ALTER TABLE "{table}" DROP CONSTRAINT "{table}_legacy_bound"')
+        cursor.execute(f'ALTER TABLE "{table}" ADD PRIMARY KEY (id, created_at)')
+        
+        # Keep ids unique across old and new rows
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        identity_sequence = cursor.fetchone()[0]
+        if identity_sequence:
+            # Identity column: the copy starts a fresh sequence, and the
+            # partition may not keep an identity of its own
+            cursor.execute(
+                f'SELECT setval(%s, COALESCE((SELECT max(id) FROM "{legacy}"), 0) + 1, false)',
+                [identity_sequence],
+            )
+            cursor.execute(f'ALTER TABLE "{legacy}" ALTER COLUMN id DROP IDENTITY')
+        else:
+            # serial: the copied default still uses the old sequence; make
+            # it outlive the legacy partition once that is archived
+            cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [legacy])
+            serial_sequence = cursor.fetchone()[0]
+            if serial_sequence:
+                cursor.execute(f'ALTER SEQUENCE {serial_sequence} OWNED BY "{table}".id')
+        
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [legacy],
+        )
+        for name, definition in cursor.fetchall():
+            cursor.execute(f'ALTER TABLE "{table}" ADD CONSTRAINT "{name}_p" {definition}')
+        
+        # Partitioned indexes: every partition gets its own copy, and the
+        # matching indexes built above are attached instead of rebuilt
+        cursor.execute(
+            f'CREATE INDEX "{table}_group_created_idx" ON "{table}" ("{group_column}", created_at DESC)'
+        )
+        for name, definition in indexes:
+            if name == f'{table}_legacy_group_created_idx':
+                continue
+            cursor.execute(f'CREATE INDEX "{name}_p" ON "{table}" USING {definition}')
+        cursor.execute(
+            f'ALTER TABLE "{table}" ATTACH PARTITION "{legacy}" '
+            f'FOR VALUES FROM (MINVALUE) TO (%s)',
+            [legacy_end],
+        )
+        # The partition bound now guarantees the same thing
+        cursor.execute(f'ALTER TABLE "{legacy}" DROP CONSTRAINT "{table}_legacy_bound"')
+    ensure_partitions()
+
+
+def ensure_partitions(months_ahead=None):
+    """
+    Create the partitions for this month and the next months_ahead months,
+    skipping months an existing partition (the legacy one) already covers.
+    Returns the names of the partitions created.
+    """
+    if not is_partitioned():
+        return []
+    if months_ahead is None:
+        months_ahead = settings.MESSAGE_PARTITION_MONTHS_AHEAD
+
+    table = Message._meta.db_table
+    current = timezone.now().date().replace(day=1)
+    bounds = partition_bounds()
+    covered_until = bounds[-1][1].date() if bounds else current
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            start = add_months(current, offset)
+            if start < covered_until:
+                continue
+            name = partition_name(start)
+            cursor.execute('SELECT to_regclass(%s)', [name])
+            if cursor.fetchone()[0] is not None:
+                continue
+            cursor.execute(
+                f'CREATE TABLE "{name}" PARTITION OF "{table}" FOR VALUES FROM (%s) TO (%s)',
+                [start, add_months(start, 1)],
+            )
+            created.append(name)
+    return created
+
+
+def partition_bounds():
+    """
+    [(partition, upper bound as a datetime)] for every attached partition, oldest first
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            '''
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            ''',
+            [Message._meta.db_table],
+        )
+        rows = cursor.fetchall()
+    bounds = []
+    for name, expression in rows:
+        # FOR VALUES FROM (...) TO ('2024-03-01 00:00:00+00')
+        if 'TO (' not in expression:
+            continue
+        upper = expression.rsplit('TO (', 1)[1].strip(")'")
+        bounds.append((name, datetime.fromisoformat(upper)))
+    return sorted(bounds, key=lambda item: item[1])
+
+
+def archive_dir():
+    """
+    MESSAGE_ARCHIVE_DIR, which must be set explicitly: partitions are dropped
+    once exported, so the files have to live on shared, durable storage.
+    """
+    path = settings.MESSAGE_ARCHIVE_DIR
+    if not path:
+        raise ImproperlyConfigured(
+            'MESSAGE_ARCHIVE_DIR must point at shared, durable storage before messages can be archived'
+        )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def read_manifest():
+    if not settings.MESSAGE_ARCHIVE_DIR:
+        # Nothing can have been archived without it
+        return []
+    path = os.path.join(archive_dir(), MANIFEST)
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(entries):
+    path = os.path.join(archive_dir(), MANIFEST)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def export_partition(name, batch_size=5000):
+    """
+    Stream one partition to <archive dir>/<name>.jsonl.gz through a
+    server-side cursor. Returns (file name, rows, sha256, first, last).
+    """
+    file_name = f'{name}.jsonl.gz'
+    path = os.path.join(archive_dir(), file_name)
+    digest = hashlib.sha256()
+    rows = 0
+    first = last = None
+
+    with transaction.atomic(), connection.chunked_cursor() as cursor:
+        cursor.execute(f'SELECT * FROM "{name}" ORDER BY created_at, id')
+        columns = [column[0] for column in cursor.description]
+        with gzip.open(f'{path}.tmp', 'wt', encoding='utf-8') as f:
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    record = {column: _json_value(value) for column, value in zip(columns, row)}
+                    line = json.dumps(record) + '\n'
+                    digest.update(line.encode())
+                    f.write(line)
+                    first = first or record['created_at']
+                    last = record['created_at']
+                rows += len(batch)
+    os.replace(f'{path}.tmp', path)
+    return file_name, rows, digest.hexdigest(), first, last
+
+
+def archive_partitions(hot_months=None):
+    """
+    Export every partition that ends more than hot_months months ago, record
+    it in the manifest and only then detach and drop it.
+    """
+    if not is_partitioned():
+        return []
+    if hot_months is None:
+        hot_months = settings.MESSAGE_HOT_MONTHS
+    # Fail before anything is exported or dropped
+    archive_dir()
+    cutoff = add_months(timezone.now().date().replace(day=1), -hot_months)
+
+    archived = []
+    for name, upper in partition_bounds():
+        if upper.date() > cutoff:
+            continue
+        file_name, rows, sha256, first, last = export_partition(name)
+        entries = [entry for entry in read_manifest() if entry['partition'] != name]
+        entries.append({
+            'partition': name,
+            'file': file_name,
+            'rows': rows,
+            'sha256': sha256,
+            'first_created_at': first,
+            'last_created_at': last,
+            'before': upper.isoformat(),
+            'archived_at': timezone.now().isoformat(),
+        })
+        write_manifest(entries)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE "{Message._meta.db_table}" DETACH PARTITION "{name}"')
+            cursor.execute(f'DROP TABLE "{name}"')
+        logger.info(f"Archived {rows} messages from {name} to {file_name}")
+        archived.append(name)
+    return archived
+
+
+def archived_messages(room_id, start, end, after=None):
+    """
+    Archived rows of one room with start <= created_at < end, oldest first,
+    streamed from the files. With after=(created_at, id) only rows past that
+    position are yielded. Only files whose time span overlaps the range are
+    opened.
+    """
+    group_column = Message._meta.get_field('group').column
+    for entry in sorted(read_manifest(), key=lambda entry: entry['first_created_at'] or ''):
+        if not entry['rows']:
+            continue
+        first = datetime.fromisoformat(entry['first_created_at'])
+        last = datetime.fromisoformat(entry['last_created_at'])
+        if last < start or first >= end:
+            continue
+        if after is not None and last < after[0]:
+            continue
+        with gzip.open(os.path.join(archive_dir(), entry['file']), 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record[group_column] != int(room_id):
+                    continue
+                created_at = datetime.fromisoformat(record['created_at'])
+                if not start <= created_at < end:
+                    continue
+                if after is not None and (created_at, record['id']) <= after:
+                    continue
+                yield record
+
+
+def room_messages_page(room_id, start, end, limit, after=None):
+    """
+    Up to `limit` messages of a room in [start, end) as dicts, oldest first,
+    starting past the (created_at, id) position `after`. Older months are
+    read through from the archive, live partitions from the database; the
+    archive always covers earlier rows than the live tables, so its rows
+    come first.
+    
+    Archive files are scanned from the top on every page, but only `limit`
+    rows are ever held in memory.
+    """
+    records = []
+    for record in archived_messages(room_id, start, end, after=after):
+        records.append(record)
+        if len(records) >= limit:
+            return records
+    
+    live = Message.objects.filter(group_id=room_id, created_at__gte=start, created_at__lt=end)
+    if after is not None:
+        created_at, pk = after
+        # (created_at, id) > after, written so created_at stays a range condition
+        live = live.filter(created_at__gte=created_at).exclude(created_at=created_at, id__lte=pk)
+    for row in live.order_by('created_at', 'id').values()[:limit - len(records)]:
+        records.append({key: _json_value(value) for key, value in row.items()})
+    return records
+
+
+def month_range(month):
+    """
+    Aware [start, end) datetimes of the month containing `month` (a date)
+    """
+    start = month.replace(day=1)
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(add_months(start, 1), time.min), tz),
+    )
+
+
+@shared_task
+def maintain_message_partitions():
+    created = ensure_partitions()
+    if created:
+        logger.info(f"Created message partitions: {', '.join(created)}")
+    return created
+
+
+@shared_task
+def archive_message_partitions():
+    if not settings.MESSAGE_ARCHIVE_DIR:
+        logger.warning("MESSAGE_ARCHIVE_DIR is not set; message partitions are not archived")
+        return []
+    return archive_partitions()
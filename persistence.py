@@ -0,0 +1,162 @@
+import asyncio
+import atexit
+import glob
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from apps.core.executors import db_sync_to_async
+from apps.messaging.models import Message
+from apps.messaging.readstate import record_new_messages
+
+logger = logging.getLogger(__name__)
+
+SPILL_FIELDS = ('sender_id', 'group_id', 'content')
+
+
+def insert_messages(messages):
+    """
+    bulk_create that keeps each message's own created_at.
+    
+    Write-behind messages are broadcast with their receive time, but
+    created_at's auto_now_add restamps every object with the flush time on
+    insert, whatever was set before. The receive times are put back with one
+    bulk_update in the same transaction.
+    """
+    received_at = [message.created_at for message in messages]
+    Message.objects.bulk_create(messages)
+    for message, created_at in zip(messages, received_at):
+        message.created_at = created_at
+    Message.objects.bulk_update(messages, ['created_at'])
+
+
+class MessageWriteBuffer:
+    """
+    Write-behind buffer for chat messages.
+    
+    Messages are collected per process and written with a single bulk_create
+    once `flush_size` are pending or `flush_interval` seconds after the first
+    one arrived, whichever comes first.
+    
+    A batch the database rejects is spilled to a JSON-lines file in
+    `spill_dir` and written again by a later successful flush, in this or any
+    other process, so messages survive database outages and restarts.
+    """
+    
+    def __init__(self, flush_size, flush_interval, spill_dir, replay_interval=60):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.spill_dir = spill_dir
+        self.replay_interval = replay_interval
+        self.pending = []
+        self._timer = None
+        self._flushes = set()
+        self._next_replay = 0
+    
+    def add(self, message):
+        """
+        Queue an unsaved Message; never waits for the database.
+        """
+        self.pending.append(message)
+        if len(self.pending) >= self.flush_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval, self._schedule_flush)
+    
+    def _schedule_flush(self):
+        task = asyncio.ensure_future(self.flush())
+        # Keep a reference so the task is not garbage collected mid-write
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+    
+    async def flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            # Shielded: a cancelled caller (loop shutdown) must not drop the batch
+            await asyncio.shield(db_sync_to_async(self._write)(batch))
+    
+    async def drain(self):
+        """
+        Flush what is pending and wait for writes already in flight.
+        Called when a socket closes, which includes server shutdown.
+        """
+        await self.flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+    
+    def flush_sync(self):
+        """
+        Write anything still pending from outside the event loop (process exit).
+        """
+        batch, self.pending = self.pending, []
+        if batch:
+            self._write(batch)
+    
+    def _write(self, batch):
+        try:
+            with transaction.atomic():
+                insert_messages(batch)
+                record_new_messages(batch)
+        except Exception as e:
+            logger.error(f"Failed to persist {len(batch)} chat messages, spilling to disk: {str(e)}")
+            self._spill(batch)
+            return
+        if time.monotonic() >= self._next_replay:
+            self._next_replay = time.monotonic() + self.replay_interval
+            self._replay_spilled()
+    
+    def _spill(self, batch):
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f'{uuid.uuid4().hex}.jsonl')
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            for message in batch:
+                record = {field: getattr(message, field) for field in SPILL_FIELDS}
+                record['created_at'] = message.created_at.isoformat()
+                f.write(json.dumps(record) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f'{path}.tmp', path)
+    
+    def _replay_spilled(self):
+        for path in glob.glob(os.path.join(self.spill_dir, '*.jsonl')):
+            # Renaming claims the file, so only one process replays it
+            claimed = f'{path}.{os.getpid()}.replaying'
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue
+            with open(claimed, encoding='utf-8') as f:
+                batch = []
+                for line in f:
+                    record = json.loads(line)
+                    record['created_at'] = datetime.fromisoformat(record['created_at'])
+                    batch.append(Message(**record))
+            try:
+                with transaction.atomic():
+                    insert_messages(batch)
+                    record_new_messages(batch)
+            except Exception as e:
+                logger.error(f"Replaying {len(batch)} spilled chat messages failed: {str(e)}")
+                os.rename(claimed, path)
+                continue
+            os.remove(claimed)
+            logger.info(f"Replayed {len(batch)} spilled chat messages")
+
+
+if settings.CHAT_WRITE_BEHIND and not settings.CHAT_SPILL_DIR:
+    # Spilled batches exist because the database was down; they must survive a redeploy
+    raise ImproperlyConfigured('CHAT_WRITE_BEHIND needs CHAT_SPILL_DIR on shared, durable storage')
+
+message_buffer = MessageWriteBuffer(
+    settings.CHAT_FLUSH_SIZE, settings.CHAT_FLUSH_INTERVAL, settings.CHAT_SPILL_DIR
+)
+atexit.register(message_buffer.flush_sync)
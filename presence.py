@@ -0,0 +1,128 @@
+import asyncio
+import time
+from collections import defaultdict
+import redis.asyncio as redis
+from django.conf import settings
+
+
+class MemoryPresence:
+    """
+    Per-process online sets, one entry per socket:
+    {room: {channel_name: (user_id, username, expires_at)}}
+    """
+    
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._rooms = defaultdict(dict)
+    
+    async def touch(self, room_id, user_id, username, channel_name):
+        self._rooms[str(room_id)][channel_name] = (user_id, username, time.monotonic() + self.ttl)
+    
+    async def leave(self, room_id, user_id, channel_name):
+        """
+        Drop one socket; True when it was the user's last one in the room
+        """
+        self._rooms[str(room_id)].pop(channel_name, None)
+        return all(entry['id'] != user_id for entry in await self.online(room_id))
+    
+    async def online(self, room_id):
+        now = time.monotonic()
+        room = self._rooms.get(str(room_id), {})
+        for channel_name in [name for name, (_, _, expires_at) in room.items() if expires_at <= now]:
+            del room[channel_name]
+        users = {user_id: username for user_id, username, _ in room.values()}
+        return [{'id': user_id, 'username': username} for user_id, username in users.items()]
+
+
+class RedisPresence:
+    """
+    Online sets shared by all processes: one sorted set per room with a
+    "user_id:channel_name:username" member per socket, scored by expiry time,
+    so entries of crashed sockets age out after `ttl` seconds.
+    """
+    
+    KEY = 'chat:presence:{room_id}'
+    
+    def __init__(self, url, ttl):
+        self.redis = redis.from_url(url, decode_responses=True)
+        self.ttl = ttl
+    
+    async def touch(self, room_id, user_id, username, channel_name):
+        key = self.KEY.format(room_id=room_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zadd(key, {f'{user_id}:{channel_name}:{username}': time.time() + self.ttl})
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
+    
+    async def leave(self, room_id, user_id, channel_name):
+        """
+        Drop one socket; True when it was the user's last one in the room
+        """
+        key = self.KEY.format(room_id=room_id)
+        prefix = f'{user_id}:'
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(key, '-inf', time.time())
+            pipe.zrange(key, 0, -1)
+            _, members = await pipe.execute()
+        own = [member for member in members if member.startswith(f'{prefix}{channel_name}:')]
+        if own:
+            await self.redis.zrem(key, *own)
+        return not any(member.startswith(prefix) for member in members if member not in own)
+    
+    async def online(self, room_id):
+        key = self.KEY.format(room_id=room_id)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(key, '-inf', time.time())
+            pipe.zrange(key, 0, -1)
+            _, members = await pipe.execute()
+        users = {}
+        for member in members:
+            user_id, _, username = member.split(':', 2)
+            users[int(user_id)] = username
+        return [{'id': user_id, 'username': username} for user_id, username in users.items()]
+
+
+class TypingCoalescer:
+    """
+    Collects typing notifications per room and broadcasts at most one
+    'typing_update' per room every `interval` seconds.
+    """
+    
+    def __init__(self, interval):
+        self.interval = interval
+        self._typing = defaultdict(set)
+        self._flushers = {}
+    
+    def add(self, channel_layer, group_name, username):
+        self._typing[group_name].add(username)
+        if group_name not in self._flushers:
+            self._flushers[group_name] = asyncio.ensure_future(
+                self._flush_later(channel_layer, group_name)
+            )
+    
+    async def _flush_later(self, channel_layer, group_name):
+        try:
+            await asyncio.sleep(self.interval)
+        finally:
+            self._flushers.pop(group_name, None)
+            usernames = self._typing.pop(group_name, set())
+        if usernames:
+            await channel_layer.group_send(
+                group_name,
+                {'type': 'typing_update', 'users': sorted(usernames)}
+            )
+
+
+if settings.CHAT_PRESENCE_BACKEND == 'redis':
+    presence = RedisPresence(settings.CHAT_PRESENCE_REDIS_URL, settings.CHAT_PRESENCE_TTL)
+else:
+    presence = MemoryPresence(settings.CHAT_PRESENCE_TTL)
+
+typing = TypingCoalescer(settings.CHAT_TYPING_INTERVAL)
+
+
+async def room_presence(room_id):
+    """
+    Users currently online in a room: [{'id': ..., 'username': ...}]
+    """
+    return await presence.online(room_id)
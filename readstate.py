@@ -0,0 +1,152 @@
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from apps.messaging.models import Message
+from apps.messaging.readcursors import GroupMessageSequence, GroupReadCursor
+
+
+def group_seqs(group_ids):
+    """
+    {group_id: last_seq}; groups without messages are missing (seq 0)
+    """
+    return dict(
+        GroupMessageSequence.objects.filter(group_id__in=group_ids).values_list('group_id', 'last_seq')
+    )
+
+
+def create_read_cursors(group_id, user_ids):
+    """
+    Cursors for new members with one INSERT; existing ones are kept.
+    New members start at the group's current sequence, with nothing unread.
+    """
+    seq = group_seqs([group_id]).get(group_id, 0)
+    GroupReadCursor.objects.bulk_create(
+        [GroupReadCursor(user_id=user_id, group_id=group_id, last_seen_seq=seq) for user_id in user_ids],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def delete_read_cursors(group_id, user_ids=None):
+    """
+    Drop the cursors of removed members (all of the group's when user_ids is None)
+    """
+    cursors = GroupReadCursor.objects.filter(group_id=group_id)
+    if user_ids is not None:
+        cursors = cursors.filter(user_id__in=user_ids)
+    cursors.delete()
+
+
+def delete_user_read_cursors(user_id, group_ids=None):
+    """
+    Drop a user's cursors for the groups they left (all of them when group_ids is None)
+    """
+    cursors = GroupReadCursor.objects.filter(user_id=user_id)
+    if group_ids is not None:
+        cursors = cursors.filter(group_id__in=group_ids)
+    cursors.delete()
+
+
+def backfill_read_cursors():
+    """
+    Create cursors for memberships that predate read tracking; run once
+    after deploying. Existing members start with nothing unread.
+    """
+    from apps.messaging.membership import member_through
+    through, group_field, user_field = member_through()
+    seqs = dict(GroupMessageSequence.objects.values_list('group_id', 'last_seq'))
+    memberships = through.objects.values_list(f'{group_field}_id', f'{user_field}_id')
+    GroupReadCursor.objects.bulk_create(
+        [
+            GroupReadCursor(group_id=group_id, user_id=user_id, last_seen_seq=seqs.get(group_id, 0))
+            for group_id, user_id in memberships.iterator()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def record_new_messages(messages):
+    """
+    Advance each group's message sequence past saved messages.
+    
+    One UPDATE per group in the batch, however many members it has. Posting
+    counts as having read the group up to one's own message, so senders'
+    cursors move forward too and nobody sees their own messages as unread.
+    
+    The UPDATE row-locks the group's single sequence row until the
+    surrounding transaction commits, so concurrent inserts into the same
+    room are serialized on it; keep that transaction short.
+    """
+    senders_by_group = defaultdict(list)
+    for message in messages:
+        senders_by_group[message.group_id].append(message.sender_id)
+    
+    for group_id, sender_ids in senders_by_group.items():
+        sequence = GroupMessageSequence.objects.filter(group_id=group_id)
+        if not sequence.update(last_seq=F('last_seq') + len(sender_ids)):
+            GroupMessageSequence.objects.bulk_create(
+                [GroupMessageSequence(group_id=group_id)], ignore_conflicts=True
+            )
+            sequence.update(last_seq=F('last_seq') + len(sender_ids))
+        # The UPDATE holds the row lock, so this is our own batch's end
+        last_seq = sequence.values_list('last_seq', flat=True).get()
+        
+        first_seq = last_seq - len(sender_ids)
+        own_seqs = {}
+        for offset, sender_id in enumerate(sender_ids, 1):
+            own_seqs[sender_id] = first_seq + offset
+        for sender_id, seq in own_seqs.items():
+            GroupReadCursor.objects.filter(
+                group_id=group_id, user_id=sender_id, last_seen_seq__lt=seq
+            ).update(last_seen_seq=seq)
+
+
+def mark_read(user_id, group_id, read_at=None, message_id=None):
+    """
+    Move a member's cursor forward to read_at (default: everything so far)
+    and return the unread count left after it. Cursors never move backwards.
+    
+    Messages newer than read_at are counted up to CHAT_UNREAD_COUNT_LIMIT
+    only, so catching up on a busy group stays a bounded query.
+    """
+    with transaction.atomic():
+        cursor, _ = GroupReadCursor.objects.select_for_update().get_or_create(
+            user_id=user_id, group_id=group_id
+        )
+        last_seq = group_seqs([group_id]).get(group_id, 0)
+        if read_at is None:
+            seen_seq = last_seq
+            read_at = timezone.now()
+        elif cursor.last_read_at is not None and read_at <= cursor.last_read_at:
+            return max(last_seq - cursor.last_seen_seq, 0)
+        else:
+            newer = (
+                Message.objects.filter(group_id=group_id, created_at__gt=read_at)
+                .exclude(sender_id=user_id)
+                .order_by()[:settings.CHAT_UNREAD_COUNT_LIMIT]
+                .count()
+            )
+            seen_seq = last_seq - newer
+        
+        cursor.last_seen_seq = max(cursor.last_seen_seq, seen_seq)
+        cursor.last_read_at = max(read_at, cursor.last_read_at or read_at)
+        if message_id is not None:
+            cursor.last_read_message_id = max(message_id, cursor.last_read_message_id or 0)
+        cursor.save(update_fields=['last_seen_seq', 'last_read_at', 'last_read_message_id', 'updated_at'])
+    return max(last_seq - cursor.last_seen_seq, 0)
+
+
+def unread_counts(user):
+    """
+    {group_id: unread count} for all of a user's groups in one query
+    """
+    unread = Greatest(
+        Coalesce(F('group__message_sequence__last_seq'), Value(0)) - F('last_seen_seq'), Value(0)
+    )
+    return dict(
+        GroupReadCursor.objects.filter(user=user).annotate(unread=unread).values_list('group_id', 'unread')
+    )
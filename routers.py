@@ -0,0 +1,70 @@
+import contextvars
+import random
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connections
+
+_pinned_to_primary = contextvars.ContextVar('pinned_to_primary', default=False)
+_replica = contextvars.ContextVar('replica', default=None)
+
+
+def pin_to_primary(pinned=True):
+    """
+    Send this context's reads to the primary. Returns a token for unpin().
+    """
+    return _pinned_to_primary.set(pinned)
+
+
+def unpin(token):
+    _pinned_to_primary.reset(token)
+
+
+@contextmanager
+def use_replica():
+    """
+    Let the reads in this block go to a replica.
+    
+    One replica is picked on entry and used for every query in the block, so
+    a request never mixes snapshots of two replicas. Does nothing without
+    replicas or when the context is pinned to the primary. Also usable as a
+    view decorator.
+    """
+    if not settings.DATABASE_REPLICAS or _pinned_to_primary.get() or _replica.get():
+        yield
+        return
+    token = _replica.set(random.choice(settings.DATABASE_REPLICAS))
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """
+    Reads and writes go to 'default'; reads move to a replica only inside
+    use_replica(), for pages that can tolerate replication lag.
+    
+    Even there, reads stay on the primary while the context is pinned (see
+    ReplicaPinningMiddleware) or inside a transaction on the primary, so
+    callers always see their own writes.
+    """
+    
+    def db_for_read(self, model, **hints):
+        replica = _replica.get()
+        if (
+            replica is None
+            or _pinned_to_primary.get()
+            or connections['default'].in_atomic_block
+        ):
+            return 'default'
+        return replica
+    
+    def db_for_write(self, model, **hints):
+        return 'default'
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas mirror the primary, so objects from any of them may relate
+        return True
+    
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,118 @@
+import heapq
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from apps.volunteers.caching import invalidate_volunteer
+from apps.volunteers.models import Volunteer, VolunteerTask
+from apps.whatsapp.tasks import enqueue_message
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ('pending', 'in_progress')
+
+
+def due_tasks(now=None):
+    """
+    Open tasks that are overdue or due within TASK_REMINDER_WINDOW_HOURS
+    and have not been reminded yet; served by the partial (status, due_date)
+    index on unreminded tasks.
+    """
+    now = now or timezone.now()
+    horizon = now + timedelta(hours=settings.TASK_REMINDER_WINDOW_HOURS)
+    return VolunteerTask.objects.filter(
+        status__in=OPEN_STATUSES,
+        due_date__lte=horizon,
+        reminder_sent_at__isnull=True,
+    )
+
+
+def reminder_text(tasks, now):
+    lines = ['Task reminder:']
+    for task in tasks:
+        due = timezone.localtime(task['due_date']).strftime('%Y-%m-%d %H:%M')
+        state = 'overdue since' if task['due_date'] < now else 'due'
+        lines.append(f"- {task['title']} ({state} {due})")
+    return '\n'.join(lines)
+
+
+@shared_task
+def send_task_reminders():
+    """
+    Queue one WhatsApp reminder per volunteer for their due and overdue
+    tasks, TASK_REMINDER_BATCH_SIZE tasks at a time. Reminded tasks are
+    stamped in the same transaction so they drop out of the next batch.
+    
+    Each batch is read with FOR UPDATE SKIP LOCKED on the primary, so
+    overlapping runs take disjoint tasks and never remind twice.
+    """
+    now = timezone.now()
+    batch_size = settings.TASK_REMINDER_BATCH_SIZE
+    reminded = 0
+    
+    while True:
+        with transaction.atomic():
+            batch = list(
+                due_tasks(now).select_for_update(skip_locked=True, of=('self',))
+                .order_by('due_date', 'id')
+                .values('id', 'title', 'due_date', 'volunteer__user_id')[:batch_size]
+            )
+            if not batch:
+                break
+            
+            by_user = defaultdict(list)
+            for task in batch:
+                by_user[task['volunteer__user_id']].append(task)
+            
+            VolunteerTask.objects.filter(id__in=[task['id'] for task in batch]).update(reminder_sent_at=now)
+            for user_id, tasks in by_user.items():
+                enqueue_message([user_id], reminder_text(tasks, now))
+        reminded += len(batch)
+    
+    logger.info(f"Queued reminders for {reminded} tasks")
+    return reminded
+
+
+def volunteer_loads():
+    """
+    {volunteer_id: open estimated hours} for every active volunteer, in one
+    aggregate query
+    """
+    rows = Volunteer.objects.filter(status='active').annotate(
+        open_hours=Coalesce(
+            Sum('tasks__estimated_hours', filter=Q(tasks__status__in=OPEN_STATUSES)), 0
+        )
+    ).values_list('id', 'open_hours')
+    return dict(rows)
+
+
+def assign_tasks(tasks):
+    """
+    Give each unsaved VolunteerTask to the active volunteer with the least
+    open work and bulk-insert them.
+    
+    Largest tasks are placed first and loads are kept in a heap, so a batch
+    costs one aggregate query and one insert regardless of its size.
+    """
+    loads = volunteer_loads()
+    if not loads:
+        raise ValueError('No active volunteers to assign tasks to')
+    
+    heap = [(hours, volunteer_id) for volunteer_id, hours in loads.items()]
+    heapq.heapify(heap)
+    for task in sorted(tasks, key=lambda task: task.estimated_hours, reverse=True):
+        hours, volunteer_id = heapq.heappop(heap)
+        task.volunteer_id = volunteer_id
+        heapq.heappush(heap, (hours + task.estimated_hours, volunteer_id))
+    
+    with transaction.atomic():
+        created = VolunteerTask.objects.bulk_create(tasks)
+    # bulk_create skips post_save, so the dashboard caches are cleared here
+    for volunteer_id in {task.volunteer_id for task in created}:
+        invalidate_volunteer(volunteer_id)
+    return created
@@ -0,0 +1,72 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, Value
+from apps.volunteers.models import SkillTag, Volunteer
+
+# 'simple' avoids English stemming, which mangles Urdu and Arabic names
+SEARCH_CONFIG = 'simple'
+
+
+def parse_skills(skills):
+    """
+    Normalized, de-duplicated tags from the comma-separated skills field
+    """
+    tags = []
+    for skill in (skills or '').split(','):
+        tag = ' '.join(skill.split()).lower()[:100]
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+def update_search_index(volunteer):
+    """
+    Rebuild the volunteer's search vector and skill tags
+    """
+    user = volunteer.user
+    email_words = re.sub(r'[@.\-_+]', ' ', user.email or '')
+    vector = (
+        SearchVector(Value(f'{user.first_name} {user.last_name}'), weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Value(f'{user.email} {email_words}'), weight='A', config=SEARCH_CONFIG)
+        + SearchVector('skills', weight='B', config=SEARCH_CONFIG)
+        + SearchVector('experience', weight='C', config=SEARCH_CONFIG)
+    )
+    Volunteer.objects.filter(pk=volunteer.pk).update(search_vector=vector)
+    sync_skill_tags(volunteer)
+
+
+def sync_skill_tags(volunteer):
+    names = parse_skills(volunteer.skills)
+    SkillTag.objects.bulk_create([SkillTag(name=name) for name in names], ignore_conflicts=True)
+    volunteer.skill_tags.set(SkillTag.objects.filter(name__in=names))
+
+
+def search_volunteers(queryset, query):
+    """
+    Filter and rank by the GIN-indexed search vector.
+    Every word is matched as a prefix so results update while typing.
+    """
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return queryset
+    search_query = SearchQuery(
+        ' & '.join(f'{term}:*' for term in terms),
+        search_type='raw',
+        config=SEARCH_CONFIG,
+    )
+    return (
+        queryset.filter(search_vector=search_query)
+        .annotate(rank=SearchRank(F('search_vector'), search_query))
+        .order_by('-rank', '-volunteer_since')
+    )
+
+
+def rebuild_search_index():
+    """
+    Backfill vectors and tags for every volunteer. Returns the count.
+    """
+    count = 0
+    for volunteer in Volunteer.objects.select_related('user').iterator(chunk_size=500):
+        update_search_index(volunteer)
+        count += 1
+    return count
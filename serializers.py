@@ -1,5 +1,7 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Message
+from apps.messaging.readstate import record_new_messages
 
 class MessageSerializer(serializers.ModelSerializer):
     sender_email = serializers.EmailField(source='sender.email', read_only=True)
@@ -7,4 +9,11 @@ class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = ['id', 'sender', 'sender_email', 'recipient', 'group', 'content', 'created_at']
-        read_only_fields = ['sender', 'created_at']
\ No newline at end of file
+        read_only_fields = ['sender', 'created_at']
+    
+    def create(self, validated_data):
+        with transaction.atomic():
+            message = super().create(validated_data)
+            if message.group_id:
+                record_new_messages([message])
+        return message
@@ -1,10 +1,73 @@
+import asyncio
+import functools
 import requests
 import logging
 import phonenumbers
+from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from apps.core.metrics import track_http
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_REGION = 'PK'
+
+_session = None
+
+
+def get_session():
+    """
+    Shared keep-alive session for the synchronous client.
+    """
+    global _session
+    if _session is None:
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.WHATSAPP_MAX_CONCURRENCY,
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+    return _session
+
+
+
+@functools.lru_cache(maxsize=settings.WHATSAPP_NUMBER_CACHE_SIZE)
+def _normalize(phone_number, region):
+    try:
+        parsed_number = phonenumbers.parse(phone_number, region)
+        
+        if phonenumbers.is_valid_number(parsed_number):
+            return phonenumbers.format_number(
+                parsed_number, 
+                phonenumbers.PhoneNumberFormat.E164
+            )
+    except phonenumbers.NumberParseException:
+        logger.error(f"Invalid phone number format: {phone_number}")
+    
+    return None
+
+
+def normalize_phone_number(phone_number, region=DEFAULT_REGION):
+    """
+    Format phone number to E.164, or None if it is missing or invalid.
+    Results are memoized in a bounded LRU cache keyed by (number, region).
+    """
+    if not phone_number:
+        return None
+    return _normalize(phone_number.strip(), region)
+
+
+def normalize_phone_numbers(phone_numbers, region=DEFAULT_REGION):
+    """
+    Normalize a list of numbers in one call, parsing each distinct number once.
+    Returns E.164 strings (or None) in input order.
+    """
+    normalized = {number: normalize_phone_number(number, region) for number in set(phone_numbers)}
+    return [normalized[number] for number in phone_numbers]
+
+
 class WhatsAppService:
     """
     WhatsApp Integration Service
@@ -16,6 +79,8 @@ class WhatsAppService:
         self.api_token = settings.WHATSAPP_API_TOKEN
         self.phone_number_id = settings.WHATSAPP_PHONE_NUMBER_ID
         self.business_account_id = settings.WHATSAPP_BUSINESS_ACCOUNT_ID
+        self.timeout = settings.WHATSAPP_TIMEOUT
+        self.session = get_session()
         
         self.headers = {
             'Authorization': f'Bearer {self.api_token}',
@@ -29,9 +94,9 @@ class WhatsAppService:
         try:
             # Phone numbers must be in E.164 format
             participant_list = [
-                self._format_phone_number(user.profile.whatsapp_number)
-                for user in participants
-                if user.profile.whatsapp_number
+                phone_number
+                for _, phone_number in self._resolve_recipients(participants)
+                if phone_number
             ]
             
             if not participant_list:
@@ -45,12 +110,13 @@ class WhatsAppService:
                 "participants": participant_list,
             }
             
-            response = requests.post(
-                f"{self.api_url}/message_groups",
-                json=payload,
-                headers=self.headers,
-                timeout=10
-            )
+            with track_http('whatsapp'):
+                response = self.session.post(
+                    f"{self.api_url}/message_groups",
+                    json=payload,
+                    headers=self.headers,
+                    timeout=self.timeout
+                )
             
             if response.status_code == 200:
                 group_data = response.json()
@@ -76,32 +142,17 @@ class WhatsAppService:
         Send personal message to user via WhatsApp
         """
         try:
-            if not hasattr(user, 'profile') or not user.profile.whatsapp_number:
-                logger.warning(f"User {user.username} has no WhatsApp number")
-                return False
-            
-            phone_number = self._format_phone_number(user.profile.whatsapp_number)
-            
+            phone_number = self._recipient_number(user)
             if not phone_number:
-                logger.warning(f"Invalid WhatsApp number for user {user.username}")
                 return False
             
-            payload = {
-                "messaging_product": "whatsapp",
-                "to": phone_number,
-                "type": "text",
-                "text": {
-                    "preview_url": True,
-                    "body": message_text
-                }
-            }
-            
-            response = requests.post(
-                f"{self.api_url}/{self.phone_number_id}/messages",
-                json=payload,
-                headers=self.headers,
-                timeout=10
-            )
+            with track_http('whatsapp'):
+                response = self.session.post(
+                    self._messages_url(),
+                    json=self._text_payload(phone_number, message_text),
+                    headers=self.headers,
+                    timeout=self.timeout
+                )
             
             if response.status_code == 200:
                 logger.info(f"Message sent to {user.username} via WhatsApp")
@@ -114,34 +165,77 @@ class WhatsAppService:
             logger.error(f"WhatsApp personal message error: {str(e)}")
             return False
 
+    def send_bulk(self, users, message_text):
+        """
+        Send the same message to many users concurrently.
+        See AsyncWhatsAppService.send_bulk for the result format.
+        """
+        return async_to_sync(AsyncWhatsAppService().send_bulk)(users, message_text)
+
+    def _recipient_number(self, user):
+        """
+        E.164 WhatsApp number for user, or None (with a warning) if missing or invalid
+        """
+        return self._resolve_recipients([user])[0][1]
+
+    def _resolve_recipients(self, users):
+        """
+        (user id, E.164 number or None) for each user, normalized in one
+        batch; repeat numbers are served from the in-process parse cache.
+        """
+        users = list(users)
+        numbers = {}
+        to_normalize = []
+        for user in users:
+            profile = getattr(user, 'profile', None)
+            if profile is None or not profile.whatsapp_number:
+                logger.warning(f"User {user.username} has no WhatsApp number")
+                numbers[user.pk] = None
+            else:
+                to_normalize.append(user)
+        
+        normalized = normalize_phone_numbers(
+            [user.profile.whatsapp_number for user in to_normalize]
+        )
+        for user, phone_number in zip(to_normalize, normalized):
+            numbers[user.pk] = phone_number
+            if not phone_number:
+                logger.warning(f"Invalid WhatsApp number for user {user.username}")
+        
+        return [(user.pk, numbers[user.pk]) for user in users]
+
+    def _messages_url(self):
+        return f"{self.api_url}/{self.phone_number_id}/messages"
+
+    def _text_payload(self, phone_number, message_text):
+        return {
+            "messaging_product": "whatsapp",
+            "to": phone_number,
+            "type": "text",
+            "text": {
+                "preview_url": True,
+                "body": message_text
+            }
+        }
+
     def _format_phone_number(self, phone_number):
         """
         Format phone number to E.164 format using phonenumbers library.
         Defaults to Pakistan (PK) if no country code is provided.
         """
-        try:
-            parsed_number = phonenumbers.parse(phone_number, "PK")
-            
-            if phonenumbers.is_valid_number(parsed_number):
-                return phonenumbers.format_number(
-                    parsed_number, 
-                    phonenumbers.PhoneNumberFormat.E164
-                )
-        except phonenumbers.NumberParseException:
-            logger.error(f"Invalid phone number format: {phone_number}")
-        
-        return None
+        return normalize_phone_number(phone_number, DEFAULT_REGION)
     
     def _get_group_invite_link(self, group_id):
         """
         Get WhatsApp group invite link
         """
         try:
-            response = requests.get(
-                f"{self.api_url}/message_groups/{group_id}/invite_link",
-                headers=self.headers,
-                timeout=10
-            )
+            with track_http('whatsapp'):
+                response = self.session.get(
+                    f"{self.api_url}/message_groups/{group_id}/invite_link",
+                    headers=self.headers,
+                    timeout=self.timeout
+                )
             
             if response.status_code == 200:
                 return response.json().get('invite_link')
@@ -157,12 +251,10 @@ class WhatsAppService:
         Add member to existing WhatsApp group
         """
         try:
-            if not user.profile.whatsapp_number:
-                logger.warning(f"User {user.username} has no WhatsApp number")
+            phone_number = self._recipient_number(user)
+            if not phone_number:
                 return False
             
-            phone_number = self._format_phone_number(user.profile.whatsapp_number)
-            
             payload = {
                 "messaging_product": "whatsapp",
                 "operation": "update",
@@ -170,12 +262,13 @@ class WhatsAppService:
                 "add_participant": [phone_number],
             }
             
-            response = requests.post(
-                f"{self.api_url}/message_groups/{group_id}",
-                json=payload,
-                headers=self.headers,
-                timeout=10
-            )
+            with track_http('whatsapp'):
+                response = self.session.post(
+                    f"{self.api_url}/message_groups/{group_id}",
+                    json=payload,
+                    headers=self.headers,
+                    timeout=self.timeout
+                )
             
             if response.status_code == 200:
                 logger.info(f"User {user.username} added to WhatsApp group {group_id}")
@@ -186,4 +279,135 @@ class WhatsAppService:
                 
         except Exception as e:
             logger.error(f"WhatsApp add member error: {str(e)}")
-            return False
\ No newline at end of file
+            return False
+
+
+class SendPacer:
+    """
+    Spaces out sends so that at most `rate` start per second across every
+    process (0 = unlimited).
+    
+    The next free send slot lives in Redis and is reserved by a script, so
+    concurrent Celery workers share one budget instead of each spending
+    WHATSAPP_MESSAGES_PER_SECOND on its own.
+    """
+    
+    KEY = 'whatsapp:send_pacer'
+    
+    # Reserve the next slot and return how long (microseconds) to wait for it
+    RESERVE_SCRIPT = """
+    local now = redis.call('TIME')
+    local now_us = tonumber(now[1]) * 1000000 + tonumber(now[2])
+    local slot = math.max(now_us, tonumber(redis.call('GET', KEYS[1]) or '0'))
+    redis.call('SET', KEYS[1], slot + tonumber(ARGV[1]), 'PX', ARGV[2])
+    return slot - now_us
+    """
+    
+    def __init__(self, url, rate):
+        self.interval_us = int(1000000 / rate) if rate else 0
+        self.url = url
+        self.redis = None
+    
+    async def wait(self):
+        if not self.interval_us:
+            return
+        if self.redis is None:
+            # Bound to the running loop; async_to_sync callers get a fresh one each time
+            import redis.asyncio as redis
+            self.redis = redis.from_url(self.url)
+        delay_us = await self.redis.eval(
+            self.RESERVE_SCRIPT, 1, self.KEY, self.interval_us, 60 * 1000
+        )
+        if delay_us > 0:
+            await asyncio.sleep(delay_us / 1000000)
+    
+    async def close(self):
+        if self.redis is not None:
+            await self.redis.aclose()
+            self.redis = None
+
+
+class AsyncWhatsAppService(WhatsAppService):
+    """
+    Async WhatsApp client with a pooled HTTP connection set.
+    Use as an async context manager to share the pool across calls.
+    """
+    
+    def __init__(self, max_concurrency=None, messages_per_second=None):
+        super().__init__()
+        self.max_concurrency = max_concurrency or settings.WHATSAPP_MAX_CONCURRENCY
+        if messages_per_second is None:
+            messages_per_second = settings.WHATSAPP_MESSAGES_PER_SECOND
+        self.pacer = SendPacer(settings.WHATSAPP_PACER_REDIS_URL, messages_per_second)
+        self.client = None
+    
+    async def __aenter__(self):
+        # httpx is only needed by bulk sends; keep it out of every other process's startup
+        import httpx
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+        )
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.client.aclose()
+        self.client = None
+        await self.pacer.close()
+    
+    async def send_text(self, phone_number, message_text):
+        """
+        Send a text message to an E.164 number. Returns (sent, error).
+        """
+        import httpx
+        await self.pacer.wait()
+        try:
+            with track_http('whatsapp'):
+                response = await self.client.post(
+                    self._messages_url(),
+                    json=self._text_payload(phone_number, message_text),
+                )
+        except httpx.HTTPError as e:
+            logger.error(f"WhatsApp personal message error: {str(e)}")
+            return False, str(e)
+        
+        if response.status_code == 200:
+            return True, None
+        logger.error(f"Failed to send personal message: {response.text}")
+        return False, response.text
+    
+    async def send_bulk(self, users, message_text):
+        """
+        Send message_text to every user with bounded concurrency.
+        
+        Returns {user_id: {'status': 'sent' | 'failed' | 'skipped', 'error': str or None}}
+        """
+        recipients = await sync_to_async(self._resolve_recipients)(users)
+        results = {}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def send_one(user_id, phone_number):
+            async with semaphore:
+                sent, error = await self.send_text(phone_number, message_text)
+            results[user_id] = {'status': 'sent' if sent else 'failed', 'error': error}
+        
+        sends = []
+        for user_id, phone_number in recipients:
+            if phone_number:
+                sends.append(send_one(user_id, phone_number))
+            else:
+                results[user_id] = {'status': 'skipped', 'error': 'No valid WhatsApp number'}
+        
+        if self.client is None:
+            async with self:
+                await asyncio.gather(*sends)
+        else:
+            await asyncio.gather(*sends)
+        
+        sent_count = sum(1 for result in results.values() if result['status'] == 'sent')
+        logger.info(f"WhatsApp bulk send: {sent_count}/{len(results)} delivered")
+        return results
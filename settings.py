@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from decouple import config
+from celery.schedules import crontab
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -13,6 +14,12 @@ DEBUG = config('DEBUG', default=True, cast=bool)
 
 ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='*').split(',')
 
+# 'web' serves HTTP/websockets; 'worker' (Celery) and 'command' (one-off
+# management commands) skip the server, websocket, REST and admin stacks
+DJANGO_PROCESS_TYPE = config('DJANGO_PROCESS_TYPE', default='web')
+WEB_ONLY_APPS = ['daphne', 'django.contrib.admin', 'rest_framework', 'channels', 'corsheaders']
+WEB_ONLY_MIDDLEWARE = ['corsheaders.middleware.CorsMiddleware']
+
 # Application definition
 INSTALLED_APPS = [
     'daphne', # ASGI Server for Channels
@@ -22,6 +29,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third Party
     'rest_framework',
@@ -38,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middleware.InstrumentationMiddleware',
+    'apps.core.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -49,6 +59,20 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if DJANGO_PROCESS_TYPE != 'web':
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in WEB_ONLY_APPS]
+    MIDDLEWARE = [item for item in MIDDLEWARE if item not in WEB_ONLY_MIDDLEWARE]
+
+# Per-view timing, query counts and outbound HTTP time, exported at /metrics/.
+# Every process folds its numbers into one Redis hash every
+# INSTRUMENTATION_FLUSH_SECONDS; /metrics/ is closed unless the scraper's
+# address is listed in INSTRUMENTATION_METRICS_IPS.
+INSTRUMENTATION_ENABLED = config('INSTRUMENTATION_ENABLED', default=False, cast=bool)
+INSTRUMENTATION_SLOW_REQUEST_MS = config('INSTRUMENTATION_SLOW_REQUEST_MS', default=500, cast=int)
+INSTRUMENTATION_SLOW_SAMPLE_RATE = config('INSTRUMENTATION_SLOW_SAMPLE_RATE', default=0.1, cast=float)
+INSTRUMENTATION_METRICS_IPS = [ip for ip in config('INSTRUMENTATION_METRICS_IPS', default='').split(',') if ip]
+INSTRUMENTATION_FLUSH_SECONDS = config('INSTRUMENTATION_FLUSH_SECONDS', default=5, cast=float)
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -71,27 +95,157 @@ WSGI_APPLICATION = 'config.wsgi.application'
 ASGI_APPLICATION = 'config.asgi.application'
 
 # Database
-DATABASES = {
-    'default': {
+# Sync workers serve one request per thread, so long-lived connections are
+# cheap. ASGI processes open one connection per database_sync_to_async thread
+# (ASGI_THREADS), so they use a shorter lifetime to avoid idle connections.
+SERVER_MODE = config('SERVER_MODE', default='wsgi')  # 'wsgi' or 'asgi'
+ASGI_THREADS = config('ASGI_THREADS', default=8, cast=int)  # see apps.core.executors
+if SERVER_MODE == 'asgi':
+    DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE_ASGI', default=60, cast=int)
+else:
+    DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE_WSGI', default=600, cast=int)
+
+
+def database(host):
+    return {
         'ENGINE': 'django.db.backends.postgresql',
         'NAME': config('POSTGRES_DB', default='muslim_revive_skills'),
         'USER': config('POSTGRES_USER', default='postgres'),
         'PASSWORD': config('POSTGRES_PASSWORD', default='secure_password'),
-        'HOST': config('DB_HOST', default='db'),
+        'HOST': host,
         'PORT': config('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
     }
+
+
+DATABASES = {
+    'default': database(config('DB_HOST', default='db')),
 }
 
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1,replica2. Tests mirror them onto
+# 'default', so two local databases are enough to exercise the router.
+DB_REPLICA_HOSTS = [host for host in config('DB_REPLICA_HOSTS', default='').split(',') if host]
+for index, host in enumerate(DB_REPLICA_HOSTS):
+    DATABASES[f'replica_{index}'] = {**database(host), 'TEST': {'MIRROR': 'default'}}
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['apps.core.routers.PrimaryReplicaRouter']
+DATABASE_REPLICA_STICKY_SECONDS = config('DATABASE_REPLICA_STICKY_SECONDS', default=5, cast=int)
+
+REDIS_HOST = config('REDIS_HOST', default='redis')
+INSTRUMENTATION_REDIS_URL = config('INSTRUMENTATION_REDIS_URL', default=f'redis://{REDIS_HOST}:6379/2')
+
 # Channel Layer (Redis)
+# A bounded per-channel capacity makes group_send drop messages for sockets
+# that stop draining instead of buffering without limit.
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [(config('REDIS_HOST', default='redis'), 6379)],
+            "hosts": [(REDIS_HOST, 6379)],
+            "capacity": config('CHAT_CHANNEL_CAPACITY', default=100, cast=int),
+            "expiry": 10,
         },
     },
 }
 
+# Chat fan-out shards, e.g. CHAT_REDIS_SHARDS=redis-chat-1,redis-chat-2:6380.
+# Each host becomes its own channel layer and rooms are spread over them by
+# apps.messaging.sharding.shard_for_room; without shards every room uses 'default'.
+CHAT_REDIS_SHARDS = [host for host in config('CHAT_REDIS_SHARDS', default='').split(',') if host]
+for shard_host in CHAT_REDIS_SHARDS:
+    shard_name, _, shard_port = shard_host.partition(':')
+    CHANNEL_LAYERS[f'chat-{shard_host}'] = {
+        **CHANNEL_LAYERS['default'],
+        "CONFIG": {
+            **CHANNEL_LAYERS['default']['CONFIG'],
+            "hosts": [(shard_name, int(shard_port or 6379))],
+        },
+    }
+CHAT_CHANNEL_SHARDS = [f'chat-{host}' for host in CHAT_REDIS_SHARDS]
+
+# Chat flow control
+CHAT_MAX_FRAME_SIZE = config('CHAT_MAX_FRAME_SIZE', default=8192, cast=int)  # characters
+CHAT_USER_RATE = config('CHAT_USER_RATE', default=5, cast=float)  # frames per second per user
+CHAT_USER_BURST = config('CHAT_USER_BURST', default=20, cast=int)
+CHAT_ROOM_RATE = config('CHAT_ROOM_RATE', default=50, cast=float)  # messages per second per room
+CHAT_ROOM_BURST = config('CHAT_ROOM_BURST', default=200, cast=int)
+CHAT_SEND_TIMEOUT = config('CHAT_SEND_TIMEOUT', default=5, cast=float)  # seconds
+CHAT_MAX_LAG = config('CHAT_MAX_LAG', default=10, cast=float)  # seconds behind the broadcast
+
+# Chat persistence: buffer messages and bulk insert them after broadcasting
+CHAT_WRITE_BEHIND = config('CHAT_WRITE_BEHIND', default=False, cast=bool)
+CHAT_FLUSH_SIZE = config('CHAT_FLUSH_SIZE', default=100, cast=int)
+CHAT_FLUSH_INTERVAL = config('CHAT_FLUSH_INTERVAL', default=0.05, cast=float)  # seconds
+# Batches the database rejects are kept here until a later flush writes them.
+# Required with CHAT_WRITE_BEHIND; must be shared, durable storage (not the
+# container filesystem).
+CHAT_SPILL_DIR = config('CHAT_SPILL_DIR', default='')
+
+# mark_read counts at most this many newer messages when recomputing a cursor
+CHAT_UNREAD_COUNT_LIMIT = config('CHAT_UNREAD_COUNT_LIMIT', default=1000, cast=int)
+
+# Chat history replayed on join; 'redis' shares the ring buffer across processes, 'memory' keeps it per process
+CHAT_HISTORY_BACKEND = config('CHAT_HISTORY_BACKEND', default='redis')
+CHAT_HISTORY_REDIS_URL = config('CHAT_HISTORY_REDIS_URL', default=f'redis://{REDIS_HOST}:6379/2')
+CHAT_HISTORY_SIZE = config('CHAT_HISTORY_SIZE', default=50, cast=int)
+
+# Monthly message partitions (apps.messaging.partitions); months older than
+# MESSAGE_HOT_MONTHS are exported to MESSAGE_ARCHIVE_DIR and dropped.
+# MESSAGE_ARCHIVE_DIR must be shared, durable storage (not the container
+# filesystem); archiving is refused while it is unset.
+MESSAGE_PARTITION_MONTHS_AHEAD = config('MESSAGE_PARTITION_MONTHS_AHEAD', default=2, cast=int)
+MESSAGE_HOT_MONTHS = config('MESSAGE_HOT_MONTHS', default=6, cast=int)
+MESSAGE_ARCHIVE_DIR = config('MESSAGE_ARCHIVE_DIR', default='')
+
+# Chat presence (online sets with heartbeat TTL) and typing indicators
+CHAT_PRESENCE_BACKEND = config('CHAT_PRESENCE_BACKEND', default='redis')
+CHAT_PRESENCE_REDIS_URL = config('CHAT_PRESENCE_REDIS_URL', default=f'redis://{REDIS_HOST}:6379/2')
+CHAT_PRESENCE_TTL = config('CHAT_PRESENCE_TTL', default=60, cast=int)  # seconds without a heartbeat
+CHAT_TYPING_INTERVAL = config('CHAT_TYPING_INTERVAL', default=1.0, cast=float)  # seconds
+
+# Cache (Redis); set CACHE_BACKEND to locmem for tests
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.redis.RedisCache'),
+        'LOCATION': config('CACHE_LOCATION', default=f'redis://{REDIS_HOST}:6379/1'),
+    }
+}
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = config('SESSION_ENGINE', default='django.contrib.sessions.backends.cached_db')
+
+# Websocket auth resolves users through apps.core.authcache (see asgi.py)
+WS_CACHED_AUTH = config('WS_CACHED_AUTH', default=True, cast=bool)
+WS_AUTH_LOCAL_TTL = config('WS_AUTH_LOCAL_TTL', default=5, cast=float)  # seconds, per process
+WS_AUTH_CACHE_TTL = config('WS_AUTH_CACHE_TTL', default=300, cast=int)  # seconds, shared cache
+
+# Celery; CELERY_BROKER_URL=memory:// with CELERY_TASK_ALWAYS_EAGER=True runs tasks inline
+CELERY_BROKER_URL = config('CELERY_BROKER_URL', default=f'redis://{REDIS_HOST}:6379/0')
+CELERY_RESULT_BACKEND = config('CELERY_RESULT_BACKEND', default=f'redis://{REDIS_HOST}:6379/0')
+CELERY_TASK_ALWAYS_EAGER = config('CELERY_TASK_ALWAYS_EAGER', default=False, cast=bool)
+CELERY_TASK_EAGER_PROPAGATES = True
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BEAT_SCHEDULE = {
+    'recompute-volunteer-stats': {
+        'task': 'apps.volunteers.stats.recompute_volunteer_stats',
+        'schedule': crontab(hour=2, minute=0),
+    },
+    'send-task-reminders': {
+        'task': 'apps.volunteers.scheduling.send_task_reminders',
+        'schedule': crontab(minute='*/15'),
+    },
+    'maintain-message-partitions': {
+        'task': 'apps.messaging.partitions.maintain_message_partitions',
+        'schedule': crontab(hour=1, minute=0),
+    },
+    'archive-message-partitions': {
+        'task': 'apps.messaging.partitions.archive_message_partitions',
+        'schedule': crontab(day_of_month=1, hour=3, minute=0),
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -135,6 +289,18 @@ AUTH_USER_MODEL = 'users.CustomUser'
 WHATSAPP_API_URL = config('WHATSAPP_API_URL', default='https://graph.facebook.com/v18.0')
 WHATSAPP_API_TOKEN = config('WHATSAPP_API_TOKEN', default='')
 WHATSAPP_PHONE_NUMBER_ID = config('WHATSAPP_PHONE_NUMBER_ID', default='')
+WHATSAPP_TIMEOUT = config('WHATSAPP_TIMEOUT', default=10, cast=float)
+WHATSAPP_MAX_CONCURRENCY = config('WHATSAPP_MAX_CONCURRENCY', default=20, cast=int)
+WHATSAPP_MESSAGES_PER_SECOND = config('WHATSAPP_MESSAGES_PER_SECOND', default=50, cast=float)  # across all workers
+WHATSAPP_PACER_REDIS_URL = config('WHATSAPP_PACER_REDIS_URL', default=f'redis://{REDIS_HOST}:6379/2')
+WHATSAPP_NUMBER_CACHE_SIZE = config('WHATSAPP_NUMBER_CACHE_SIZE', default=65536, cast=int)
+WHATSAPP_BATCH_SIZE = config('WHATSAPP_BATCH_SIZE', default=100, cast=int)
+WHATSAPP_MAX_RETRIES = config('WHATSAPP_MAX_RETRIES', default=5, cast=int)
+WHATSAPP_RETRY_BACKOFF = config('WHATSAPP_RETRY_BACKOFF', default=30, cast=int)  # seconds, doubled per retry
+
+# Volunteer task scheduling
+TASK_REMINDER_WINDOW_HOURS = config('TASK_REMINDER_WINDOW_HOURS', default=24, cast=int)
+TASK_REMINDER_BATCH_SIZE = config('TASK_REMINDER_BATCH_SIZE', default=500, cast=int)
 
 # CORS Settings (To allow your frontend fetch calls if running separately)
 CORS_ALLOW_ALL_ORIGINS = True 
\ No newline at end of file
@@ -0,0 +1,25 @@
+import hashlib
+from django.conf import settings
+
+
+def _weight(shard, room_id):
+    digest = hashlib.blake2b(f'{shard}:{room_id}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def shard_for_room(room_id, shards=None):
+    """
+    Channel layer alias that carries a room's fan-out.
+    
+    Uses rendezvous (highest random weight) hashing: every room goes to the
+    shard with the highest hash of (shard, room), so adding a shard only moves
+    the ~1/N of rooms that now score highest on it, and removing one only
+    moves that shard's rooms.
+    """
+    if shards is None:
+        shards = settings.CHAT_CHANNEL_SHARDS
+    if not shards:
+        # Not imported at module level: membership changes in Celery workers land here
+        from channels.layers import DEFAULT_CHANNEL_LAYER
+        return DEFAULT_CHANNEL_LAYER
+    return max(shards, key=lambda shard: _weight(shard, room_id))
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from apps.volunteers.caching import invalidate_volunteer
+from apps.volunteers.models import Volunteer, VolunteerTask
+from apps.volunteers.scheduling import OPEN_STATUSES
+from apps.volunteers.search import update_search_index
+
+User = get_user_model()
+
+SEARCHABLE_VOLUNTEER_FIELDS = {'skills', 'experience', 'user'}
+SEARCHABLE_USER_FIELDS = {'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save, sender=Volunteer)
+def index_volunteer(sender, instance, update_fields=None, **kwargs):
+    # Counter updates (update_fields=total_hours, ...) leave the index alone
+    if update_fields and not SEARCHABLE_VOLUNTEER_FIELDS & set(update_fields):
+        return
+    update_search_index(instance)
+
+
+@receiver(post_save, sender=User)
+def reindex_volunteer_user(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields and not SEARCHABLE_USER_FIELDS & set(update_fields)):
+        return
+    volunteer = Volunteer.objects.filter(user=instance).first()
+    if volunteer is not None:
+        update_search_index(volunteer)
+
+
+@receiver(post_save, sender=Volunteer)
+def invalidate_volunteer_cache(sender, instance, **kwargs):
+    invalidate_volunteer(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=VolunteerTask)
+def invalidate_volunteer_task_cache(sender, instance, **kwargs):
+    invalidate_volunteer(instance.volunteer_id)
+
+
+
+@receiver(pre_save, sender=VolunteerTask)
+def reset_task_reminder(sender, instance, update_fields=None, **kwargs):
+    # A moved due date or a reopened task needs a fresh reminder
+    if instance.pk is None or instance.reminder_sent_at is None:
+        return
+    if update_fields is not None and not {'due_date', 'status'} & set(update_fields):
+        return
+    old = VolunteerTask.objects.filter(pk=instance.pk).values('due_date', 'status').first()
+    if old is None:
+        return
+    reopened = old['status'] not in OPEN_STATUSES and instance.status in OPEN_STATUSES
+    if old['due_date'] == instance.due_date and not reopened:
+        return
+    instance.reminder_sent_at = None
+    if update_fields is not None:
+        # update_fields cannot be extended from here, so clear the column directly
+        VolunteerTask.objects.filter(pk=instance.pk).update(reminder_sent_at=None)
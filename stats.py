@@ -0,0 +1,149 @@
+import logging
+from datetime import timedelta
+from celery import shared_task
+from django.db import transaction
+from django.db.models import Count, DateField, F, Sum
+from django.db.models.functions import Trunc
+from apps.volunteers.models import Volunteer, VolunteerTask, VolunteerStatsRollup
+
+logger = logging.getLogger(__name__)
+
+
+def _contribution(status, hours):
+    """
+    (hours, tasks) a task in this state adds to its volunteer's counters
+    """
+    if status == 'completed':
+        return hours, 1
+    return 0, 0
+
+
+def apply_task_change(volunteer, old_status, old_hours, new_status, new_hours):
+    """
+    Adjust the volunteer's counters for a task moving between states.
+    
+    Uses F() expressions so concurrent updates cannot overwrite each other,
+    and writes only the two counter columns.
+    """
+    old_total, old_count = _contribution(old_status, old_hours)
+    new_total, new_count = _contribution(new_status, new_hours)
+    hours_delta = new_total - old_total
+    tasks_delta = new_count - old_count
+    if not hours_delta and not tasks_delta:
+        return
+    
+    volunteer.total_hours = F('total_hours') + hours_delta
+    volunteer.total_tasks_completed = F('total_tasks_completed') + tasks_delta
+    volunteer.save(update_fields=['total_hours', 'total_tasks_completed'])
+    volunteer.refresh_from_db(fields=['total_hours', 'total_tasks_completed'])
+
+
+def recompute_volunteer_counters():
+    """
+    Rebuild total_hours/total_tasks_completed from VolunteerTask rows with
+    one grouped query. Returns the number of volunteers that had drifted.
+    
+    The volunteers are locked before the tasks are summed, so a task update
+    that commits in between either is in the sum or applies its delta after
+    the rebuilt totals are written, never lost.
+    """
+    with transaction.atomic():
+        changed = []
+        volunteers = list(
+            Volunteer.objects.select_for_update()
+            .only('id', 'total_hours', 'total_tasks_completed')
+        )
+        totals = {
+            row['volunteer']: (row['hours'] or 0, row['completed'])
+            for row in VolunteerTask.objects.filter(status='completed')
+            .values('volunteer')
+            .annotate(hours=Sum('actual_hours'), completed=Count('id'))
+        }
+        for volunteer in volunteers:
+            hours, completed = totals.get(volunteer.id, (0, 0))
+            if (volunteer.total_hours, volunteer.total_tasks_completed) != (hours, completed):
+                volunteer.total_hours = hours
+                volunteer.total_tasks_completed = completed
+                changed.append(volunteer)
+        Volunteer.objects.bulk_update(changed, ['total_hours', 'total_tasks_completed'], batch_size=1000)
+    
+    return len(changed)
+
+
+def period_start(value, period):
+    """
+    First day of the 'day', 'week' or 'month' period containing value
+    """
+    day = value.date() if hasattr(value, 'date') else value
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def rebuild_rollups(period='month', since=None):
+    """
+    Recompute per-group rollups for one period kind ('day', 'week' or 'month'),
+    optionally only for periods from the one containing `since` onwards.
+    """
+    tasks = VolunteerTask.objects.filter(status='completed', completed_at__isnull=False)
+    stale = VolunteerStatsRollup.objects.filter(period=period)
+    if since:
+        floor = period_start(since, period)
+        tasks = tasks.filter(completed_at__date__gte=floor)
+        stale = stale.filter(period_start__gte=floor)
+    
+    rows = (
+        tasks.annotate(period_start=Trunc('completed_at', period, output_field=DateField()))
+        .values('volunteer__assigned_group', 'period_start')
+        .annotate(
+            total_hours=Sum('actual_hours'),
+            tasks_completed=Count('id'),
+            active_volunteers=Count('volunteer', distinct=True),
+        )
+    )
+    rollups = [
+        VolunteerStatsRollup(
+            group_id=row['volunteer__assigned_group'],
+            period=period,
+            period_start=row['period_start'],
+            total_hours=row['total_hours'] or 0,
+            tasks_completed=row['tasks_completed'],
+            active_volunteers=row['active_volunteers'],
+        )
+        for row in rows
+    ]
+    
+    with transaction.atomic():
+        stale.delete()
+        VolunteerStatsRollup.objects.bulk_create(rollups, batch_size=1000)
+    
+    return len(rollups)
+
+
+def leaderboard(limit=10, group=None):
+    """
+    Top active volunteers by hours, read straight from the counter columns
+    """
+    volunteers = Volunteer.objects.filter(status='active')
+    if group is not None:
+        volunteers = volunteers.filter(assigned_group=group)
+    return volunteers.select_related('user').order_by('-total_hours', 'id')[:limit]
+
+
+def group_stats(group, period='month', limit=12):
+    """
+    Latest precomputed rollups for a group, newest first
+    """
+    return VolunteerStatsRollup.objects.filter(group=group, period=period)[:limit]
+
+
+@shared_task
+def recompute_volunteer_stats():
+    drifted = recompute_volunteer_counters()
+    if drifted:
+        logger.warning(f"Volunteer counters drifted for {drifted} volunteers; repaired")
+    for period in ('week', 'month'):
+        rebuild_rollups(period)
+    return drifted
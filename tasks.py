@@ -0,0 +1,155 @@
+import logging
+from datetime import timedelta
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from apps.messaging.models import IslamicMessagingGroup
+from apps.whatsapp.models import WhatsAppDeadLetter
+from apps.whatsapp.services import WhatsAppService
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+THROUGHPUT_KEY = 'whatsapp:throughput:{status}:{minute}'
+THROUGHPUT_TTL = 60 * 60 * 2
+
+
+def enqueue_message(user_ids, message_text):
+    """
+    Queue a WhatsApp message for the given users and return immediately.
+    The task is published once the surrounding transaction commits.
+    """
+    user_ids = list(user_ids)
+    if user_ids:
+        transaction.on_commit(lambda: send_whatsapp_messages.delay(user_ids, message_text))
+
+
+@shared_task(bind=True, max_retries=settings.WHATSAPP_MAX_RETRIES)
+def send_whatsapp_messages(self, user_ids, message_text):
+    """
+    Deliver one message to many users in batches of WHATSAPP_BATCH_SIZE.
+    Failed recipients are retried with exponential backoff and dead-lettered
+    once the retries are used up.
+    """
+    service = WhatsAppService()
+    batch_size = settings.WHATSAPP_BATCH_SIZE
+    failed = {}
+    sent_count = 0
+
+    for start in range(0, len(user_ids), batch_size):
+        users = User.objects.filter(
+            id__in=user_ids[start:start + batch_size]
+        ).select_related('profile')
+        results = service.send_bulk(users, message_text)
+        for user_id, result in results.items():
+            if result['status'] == 'sent':
+                sent_count += 1
+            elif result['status'] == 'failed':
+                failed[user_id] = result['error']
+
+    record_throughput('sent', sent_count)
+    if not failed:
+        return {'sent': sent_count, 'failed': 0}
+
+    record_throughput('failed', len(failed))
+    if self.request.retries < self.max_retries:
+        countdown = settings.WHATSAPP_RETRY_BACKOFF * (2 ** self.request.retries)
+        logger.warning(f"Retrying WhatsApp send to {len(failed)} users in {countdown}s")
+        raise self.retry(args=(list(failed), message_text), countdown=countdown)
+
+    WhatsAppDeadLetter.objects.bulk_create([
+        WhatsAppDeadLetter(
+            user_id=user_id,
+            message_text=message_text,
+            error=error or '',
+            attempts=self.request.retries + 1,
+        )
+        for user_id, error in failed.items()
+    ])
+    record_throughput('dead_lettered', len(failed))
+    logger.error(f"WhatsApp send to {len(failed)} users dead-lettered")
+    return {'sent': sent_count, 'failed': len(failed)}
+
+
+@shared_task(bind=True)
+def provision_whatsapp_group(self, group_id, member_ids):
+    """
+    Create the WhatsApp group for a messaging group and notify its members.
+    Progress is published as PROGRESS task state with done/total counts.
+    """
+    group = IslamicMessagingGroup.objects.get(pk=group_id)
+    members = list(User.objects.filter(id__in=member_ids).select_related('profile'))
+    total = len(members)
+    self.update_state(state='PROGRESS', meta={'step': 'creating_group', 'done': 0, 'total': total})
+    
+    service = WhatsAppService()
+    result = service.create_group(group.name, members)
+    if not result:
+        return {'status': 'failed', 'done': 0, 'total': total}
+    
+    group.whatsapp_group_id = result['group_id']
+    group.whatsapp_group_link = result['group_link']
+    group.save(update_fields=['whatsapp_group_id', 'whatsapp_group_link'])
+    
+    message = f"آپ کو {group.name} رضاکار گروپ میں شامل کیا گیا ہے۔\n\nگروپ لنک: {result['group_link']}"
+    batch_size = settings.WHATSAPP_BATCH_SIZE
+    sent_count = 0
+    failed_ids = []
+    for start in range(0, total, batch_size):
+        results = service.send_bulk(members[start:start + batch_size], message)
+        sent_count += sum(1 for outcome in results.values() if outcome['status'] == 'sent')
+        failed_ids.extend(user_id for user_id, outcome in results.items() if outcome['status'] == 'failed')
+        self.update_state(state='PROGRESS', meta={
+            'step': 'notifying_members',
+            'done': min(start + batch_size, total),
+            'total': total,
+        })
+    
+    record_throughput('sent', sent_count)
+    if failed_ids:
+        # Hand failures to the regular queue for retries and dead-lettering
+        record_throughput('failed', len(failed_ids))
+        send_whatsapp_messages.apply_async(
+            args=(failed_ids, message), countdown=settings.WHATSAPP_RETRY_BACKOFF
+        )
+    
+    return {
+        'status': 'success',
+        'group_link': result['group_link'],
+        'done': total,
+        'total': total,
+        'failed': len(failed_ids),
+    }
+
+
+def record_throughput(status, count):
+    """
+    Add count to the current minute's counter for status
+    """
+    if not count:
+        return
+    key = THROUGHPUT_KEY.format(status=status, minute=timezone.now().strftime('%Y%m%d%H%M'))
+    cache.add(key, 0, THROUGHPUT_TTL)
+    try:
+        cache.incr(key, count)
+    except ValueError:
+        # The key expired between add() and incr()
+        cache.set(key, count, THROUGHPUT_TTL)
+
+
+def throughput(status='sent', minutes=60):
+    """
+    Per-minute counts for status over the last `minutes`, oldest first
+    """
+    now = timezone.now()
+    stamps = [
+        (now - timedelta(minutes=offset)).strftime('%Y%m%d%H%M')
+        for offset in range(minutes - 1, -1, -1)
+    ]
+    keys = [THROUGHPUT_KEY.format(status=status, minute=stamp) for stamp in stamps]
+    values = cache.get_many(keys)
+    return [(stamp, values.get(key, 0)) for stamp, key in zip(stamps, keys)]
@@ -0,0 +1,61 @@
+import time
+
+
+class TokenBucket:
+    """
+    Allows `rate` events per second with bursts of up to `capacity`
+    """
+    
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated_at')
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+    
+    def consume(self, amount=1):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= amount:
+            self.tokens -= amount
+            return True
+        return False
+
+
+class RateLimiter:
+    """
+    One token bucket per key (user id, room id) within this process.
+    Buckets idle long enough to be full again are discarded.
+    """
+    
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets = {}
+        self._next_sweep = time.monotonic() + self.refill_seconds
+    
+    @property
+    def refill_seconds(self):
+        return self.capacity / self.rate if self.rate else 60
+    
+    def allow(self, key):
+        if not self.rate:
+            return True
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+        allowed = bucket.consume()
+        self._sweep()
+        return allowed
+    
+    def _sweep(self):
+        now = time.monotonic()
+        if now < self._next_sweep:
+            return
+        idle_since = now - self.refill_seconds
+        self._buckets = {
+            key: bucket for key, bucket in self._buckets.items() if bucket.updated_at > idle_since
+        }
+        self._next_sweep = now + self.refill_seconds
@@ -7,5 +7,7 @@ urlpatterns = [
     path('register/', views.volunteer_registration, name='register'),
     path('dashboard/', views.volunteer_dashboard, name='dashboard'),
     path('task/<int:task_id>/update/', views.volunteer_task_update, name='task-update'),
+    path('tasks/assign/', views.assign_volunteer_tasks, name='assign-tasks'),
     path('group/create/', views.create_volunteer_group, name='create-group'),
+    path('group/provision/<str:job_id>/', views.group_provisioning_status, name='group-provision-status'),
 ]
\ No newline at end of file
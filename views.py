@@ -1,14 +1,25 @@
+import json
+import uuid
+from celery.result import AsyncResult
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.generic import ListView, DetailView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import JsonResponse
-from django.db.models import Q
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from apps.core.routers import use_replica
 from apps.volunteers.models import Volunteer, VolunteerTask
 from apps.messaging.models import IslamicMessagingGroup
+from apps.volunteers.caching import task_page
 from apps.volunteers.forms import VolunteerRegistrationForm
-from apps.whatsapp.services import WhatsAppService
+from apps.volunteers.search import search_volunteers
+from apps.volunteers.scheduling import assign_tasks
+from apps.volunteers.stats import apply_task_change
+from apps.messaging.membership import add_members
+from apps.whatsapp.tasks import enqueue_message, provision_whatsapp_group
 
 User = get_user_model()
 
@@ -22,26 +33,36 @@ class VolunteerListView(LoginRequiredMixin, ListView):
         queryset = Volunteer.objects.filter(status='active')
         search_query = self.request.GET.get('q')
         if search_query:
-            queryset = queryset.filter(
-                Q(user__first_name__icontains=search_query) |
-                Q(user__last_name__icontains=search_query) |
-                Q(user__email__icontains=search_query) |
-                Q(skills__icontains=search_query)
-            )
+            queryset = search_volunteers(queryset, search_query)
+        skill = self.request.GET.get('skill')
+        if skill:
+            queryset = queryset.filter(skill_tags__name=' '.join(skill.split()).lower())
         return queryset.select_related('user', 'assigned_group')
+    
+    def get(self, request, *args, **kwargs):
+        # Rendered inside the block so the page's lazy queries use the replica too
+        with use_replica():
+            return super().get(request, *args, **kwargs).render()
 
 class VolunteerDetailView(LoginRequiredMixin, DetailView):
     model = Volunteer
     template_name = 'volunteers/detail.html'
     context_object_name = 'volunteer'
     
+    def get_queryset(self):
+        return Volunteer.objects.select_related('user', 'assigned_group')
+    
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        volunteer = self.get_object()
-        context['tasks'] = volunteer.tasks.all().order_by('-assigned_at')[:5]
+        volunteer = self.object
+        context['tasks'], _ = task_page(volunteer, limit=5)
         context['total_hours'] = volunteer.total_hours
         context['group'] = volunteer.assigned_group
         return context
+    
+    def get(self, request, *args, **kwargs):
+        with use_replica():
+            return super().get(request, *args, **kwargs).render()
 
 @login_required
 def volunteer_registration(request):
@@ -65,11 +86,10 @@ def volunteer_registration(request):
             )
             volunteer_group.add_member(request.user)
             volunteer.assigned_group = volunteer_group
-            volunteer.save()
+            volunteer.save(update_fields=['assigned_group'])
             
-            whatsapp_service = WhatsAppService()
-            whatsapp_service.send_message_to_user(
-                request.user,
+            enqueue_message(
+                [request.user.id],
                 f"السلام علیکم! {request.user.first_name}\n\nخوش آمدید Muslim Revive Skills میں۔\nآپ کا Volunteer ID: {volunteer.volunteer_id}\n\nآپ کا WhatsApp گروپ:\n{volunteer_group.whatsapp_group_link}"
             )
             return redirect('volunteers:dashboard')
@@ -78,15 +98,23 @@ def volunteer_registration(request):
     return render(request, 'volunteers/register.html', {'form': form})
 
 @login_required
+@use_replica()
 def volunteer_dashboard(request):
-    try:
-        volunteer = request.user.volunteer_profile
-    except Volunteer.DoesNotExist:
+    volunteer = (
+        Volunteer.objects.select_related('user', 'assigned_group')
+        .filter(user=request.user)
+        .first()
+    )
+    if volunteer is None:
         return redirect('volunteers:register')
     
+    before = request.GET.get('before')
+    tasks, next_cursor = task_page(volunteer, before=int(before) if before and before.isdigit() else None)
+    
     context = {
         'volunteer': volunteer,
-        'tasks': volunteer.tasks.all().order_by('-assigned_at'),
+        'tasks': tasks,
+        'next_cursor': next_cursor,
         'group': volunteer.assigned_group,
         'total_hours': volunteer.total_hours,
         'tasks_completed': volunteer.total_tasks_completed,
@@ -103,16 +131,19 @@ def volunteer_task_update(request, task_id):
         status = request.POST.get('status')
         hours = request.POST.get('hours', 0)
         if status in ['pending', 'in_progress', 'completed', 'cancelled']:
-            task.status = status
-            task.actual_hours = int(hours)
-            if status == 'completed':
-                from django.utils import timezone
-                task.completed_at = timezone.now()
-                volunteer = task.volunteer
-                volunteer.total_hours += int(hours)
-                volunteer.total_tasks_completed += 1
-                volunteer.save()
-            task.save()
+            with transaction.atomic():
+                # Re-read under a row lock so two concurrent updates cannot
+                # both compute their counter delta from the same old state
+                task = VolunteerTask.objects.select_for_update().select_related('volunteer').get(id=task.id)
+                old_status, old_hours = task.status, task.actual_hours
+                task.status = status
+                task.actual_hours = int(hours)
+                update_fields = ['status', 'actual_hours']
+                if status == 'completed' and old_status != 'completed':
+                    task.completed_at = timezone.now()
+                    update_fields.append('completed_at')
+                task.save(update_fields=update_fields)
+                apply_task_change(task.volunteer, old_status, old_hours, task.status, task.actual_hours)
             return JsonResponse({'success': True})
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
@@ -125,32 +156,71 @@ def create_volunteer_group(request):
         group_name = request.POST.get('name')
         group_members_ids = request.POST.getlist('members')
         
-        group = IslamicMessagingGroup.objects.create(
-            name=group_name,
-            group_type='volunteer',
-            creator=request.user,
-            whatsapp_auto_add=True,
-        )
-        
-        members = User.objects.filter(id__in=group_members_ids)
-        for member in members:
-            group.add_member(member)
-        
-        whatsapp_service = WhatsAppService()
-        result = whatsapp_service.create_group(group_name, list(members))
-        
-        if result:
-            group.whatsapp_group_id = result['group_id']
-            group.whatsapp_group_link = result['group_link']
-            group.save()
+        job_id = str(uuid.uuid4())
+        with transaction.atomic():
+            group = IslamicMessagingGroup.objects.create(
+                name=group_name,
+                group_type='volunteer',
+                creator=request.user,
+                whatsapp_auto_add=True,
+            )
+            
+            member_ids = list(User.objects.filter(id__in=group_members_ids).values_list('id', flat=True))
+            add_members(group, member_ids)
             
-            message = f"آپ کو {group_name} رضاکار گروپ میں شامل کیا گیا ہے۔\n\nگروپ لنک: {result['group_link']}"
-            for member in members:
-                whatsapp_service.send_message_to_user(member, message)
+            # WhatsApp group creation and notifications run in the background,
+            # queued only once the group is committed so the worker can load it
+            transaction.on_commit(lambda: provision_whatsapp_group.apply_async(
+                args=(group.id, member_ids), task_id=job_id
+            ))
         
         return JsonResponse({
             'success': True,
             'group_id': group.id,
-            'whatsapp_link': group.whatsapp_group_link
+            'whatsapp_link': group.whatsapp_group_link,
+            'job_id': job_id,
         })
-    return render(request, 'volunteers/create_group.html')
\ No newline at end of file
+    return render(request, 'volunteers/create_group.html')
+
+@login_required
+def group_provisioning_status(request, job_id):
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    
+    job = AsyncResult(job_id)
+    info = job.info if isinstance(job.info, dict) else {}
+    return JsonResponse({'state': job.state, **info})
+
+@login_required
+def assign_volunteer_tasks(request):
+    """
+    Create tasks from a JSON list and balance them across active volunteers
+    by open estimated hours
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request'}, status=400)
+    
+    try:
+        items = json.loads(request.body).get('tasks', [])
+        tasks = []
+        for item in items:
+            due_date = parse_datetime(item['due_date'])
+            if due_date is None:
+                raise ValueError(f"Invalid due_date: {item['due_date']}")
+            tasks.append(VolunteerTask(
+                title=item['title'],
+                description=item.get('description', ''),
+                priority=int(item.get('priority', 2)),
+                estimated_hours=int(item.get('estimated_hours', 1)),
+                due_date=due_date,
+            ))
+        created = assign_tasks(tasks)
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'assignments': [{'task_id': task.id, 'volunteer_id': task.volunteer_id} for task in created],
+    })
@@ -0,0 +1,61 @@
+import json
+from urllib.parse import parse_qs
+import msgpack
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+
+
+def negotiate(scope):
+    """
+    Wire format requested by the client: the 'msgpack' subprotocol or
+    ?format=msgpack selects binary msgpack frames, anything else JSON text.
+    """
+    if MSGPACK in scope.get('subprotocols', ()):
+        return MSGPACK
+    query = parse_qs(scope.get('query_string', b'').decode())
+    if query.get('format', [JSON])[0] == MSGPACK:
+        return MSGPACK
+    return JSON
+
+
+def encode(payload, wire_format):
+    """
+    One frame: str for JSON clients, bytes for msgpack clients
+    """
+    if wire_format == MSGPACK:
+        return msgpack.packb(payload)
+    return json.dumps(payload)
+
+
+def decode(text_data=None, bytes_data=None):
+    """
+    Parse an incoming frame into a dict; raises ValueError if it is not one
+    """
+    try:
+        if text_data is not None:
+            data = json.loads(text_data)
+        else:
+            data = msgpack.unpackb(bytes_data)
+    except (ValueError, msgpack.UnpackException) as e:
+        raise ValueError(str(e))
+    if not isinstance(data, dict):
+        raise ValueError('Frame must be an object')
+    return data
+
+
+def chat_message_frames(event, sender_id, created_at):
+    """
+    Both encodings of a chat broadcast, built once per group_send so every
+    recipient reuses the same frame. JSON keeps the established shape; the
+    compact msgpack form carries the sender id and an epoch-millisecond timestamp.
+    """
+    return {
+        JSON: json.dumps({'type': 'chat_message', **event}),
+        MSGPACK: msgpack.packb({
+            't': 'chat_message',
+            'm': event['message'],
+            's': sender_id,
+            'ts': int(created_at.timestamp() * 1000),
+        }),
+    }
@@ -0,0 +1,19 @@
+from channels.auth import AuthMiddleware
+from channels.sessions import SessionMiddlewareStack
+from apps.core.authcache import session_user
+from apps.core.executors import db_sync_to_async
+
+
+class CachedAuthMiddleware(AuthMiddleware):
+    """
+    channels' AuthMiddleware with scope['user'] resolved through
+    apps.core.authcache, so a reconnect storm is served from memory and
+    Redis instead of a session and a user query per socket.
+    """
+    
+    async def resolve_scope(self, scope):
+        scope['user']._wrapped = await db_sync_to_async(session_user)(scope['session'])
+
+
+def CachedAuthMiddlewareStack(inner):
+    return SessionMiddlewareStack(CachedAuthMiddleware(inner))